@@ -0,0 +1,242 @@
+"""
+Organization-wide payroll analytics over employees and their latest tax
+
+The dashboard never scans employees / employee_taxes. Instead three small
+aggregate tables (per tax slab, per experience band, and a histogram of
+effective rates) are kept up to date in the same transaction as every
+employee tax write, and fully rebuilt by refresh() after a recompute.
+Each /analytics endpoint reads a handful of rows from them.
+
+Slab indexes refer to the default schedule, which changes with the rule
+files and when a new rule year takes effect. Writers call ensure_current()
+first; it rebuilds the aggregates once for the new schedule, so a
+superseded row is never subtracted from a slab it was not counted in.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models, tax_engine
+
+# (min_years, max_years) per band; None means no upper limit
+EXPERIENCE_BANDS = [(0, 2), (3, 5), (6, 10), (11, 20), (21, None)]
+_BAND_STARTS = np.array([low for low, _ in EXPERIENCE_BANDS[1:]])
+
+# Width of one rate histogram bucket, in percentage points; percentiles are
+# accurate to this resolution
+RATE_BUCKET_WIDTH = 0.1
+
+REFRESH_CHUNK_SIZE = 5000
+
+
+def band_label(band: int) -> str:
+    low, high = EXPERIENCE_BANDS[band]
+    return f"{low}+ years" if high is None else f"{low}-{high} years"
+
+
+def _group(keys: np.ndarray, salaries: np.ndarray, taxes: np.ndarray, sign: int) -> Dict[int, dict]:
+    """Count / salary / tax totals per distinct key"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique))
+    salary_sums = np.bincount(inverse, weights=salaries, minlength=len(unique))
+    tax_sums = np.bincount(inverse, weights=taxes, minlength=len(unique))
+    return {
+        int(key): {
+            "employee_count": sign * int(count),
+            "total_salary": sign * float(salary),
+            "total_tax": sign * float(tax),
+        }
+        for key, count, salary, tax in zip(unique, counts, salary_sums, tax_sums)
+    }
+
+
+def _aggregate(years, salaries, taxes, rates, sign: int = 1):
+    years = np.asarray(years, dtype=np.int64)
+    salaries = np.asarray(salaries, dtype=np.float64)
+    taxes = np.asarray(taxes, dtype=np.float64)
+    rates = np.asarray(rates, dtype=np.float64)
+
+    brackets = _group(tax_engine.get_schedule().bracket_index_many(salaries), salaries, taxes, sign)
+    bands = _group(np.searchsorted(_BAND_STARTS, years, side="right"), salaries, taxes, sign)
+    # Rates are stored to two decimals; round before flooring so 5.4 lands in bucket 54
+    buckets = np.floor(np.round(rates / RATE_BUCKET_WIDTH, 6)).astype(np.int64)
+    unique, counts = np.unique(buckets, return_counts=True)
+    rate_buckets = {int(b): {"employee_count": sign * int(c)} for b, c in zip(unique, counts)}
+    return brackets, bands, rate_buckets
+
+
+def _add(db: Session, model, key: str, deltas: Dict[int, dict]):
+    """Add each delta onto its aggregate row, creating missing rows"""
+    if not deltas:
+        return
+    rows = [{key: k, **values} for k, values in deltas.items()]
+    counters = list(rows[0].keys())[1:]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        upsert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(model)
+        db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[key],
+                set_={c: getattr(model, c) + upsert.excluded[c] for c in counters},
+            ),
+            rows,
+        )
+        return
+    existing = set(db.scalars(select(getattr(model, key)).where(getattr(model, key).in_(deltas))))
+    for row in rows:
+        if row[key] in existing:
+            db.execute(
+                update(model)
+                .where(getattr(model, key) == row[key])
+                .values({c: getattr(model, c) + row[c] for c in counters})
+            )
+        else:
+            db.execute(insert(model), [row])
+
+
+def record_employee_taxes(db: Session, years: Sequence[int], salaries: Sequence[float],
+                          taxes: Sequence[float], rates: Sequence[float], sign: int = 1):
+    """
+    Fold new latest-tax rows into the aggregates (sign=-1 removes rows that
+    were superseded). Runs in the caller's transaction; the caller commits.
+    """
+    if len(salaries) == 0:
+        return
+    brackets, bands, rate_buckets = _aggregate(years, salaries, taxes, rates, sign)
+    _add(db, models.PayrollBracketStat, "bracket_index", brackets)
+    _add(db, models.PayrollExperienceStat, "band", bands)
+    _add(db, models.PayrollRateBucket, "bucket", rate_buckets)
+
+
+def schedule_key() -> str:
+    """Identity of the schedule the slab indexes refer to (rules digest, regime, rule year)"""
+    schedule = tax_engine.get_schedule()
+    return f"{tax_engine.registry.version}:{schedule.regime}:{schedule.effective_from}"
+
+
+def ensure_current(db: Session):
+    """
+    Rebuild the aggregates if they were built against another default
+    schedule. Call before changing employee taxes; runs in the caller's
+    transaction. The stored key is read every time (one primary-key lookup):
+    workers on different rules, as during a rolling deploy, must each see it.
+    """
+    key = schedule_key()
+    state = db.get(models.PayrollStatsState, 1)
+    if state is not None and state.schedule_key == key:
+        return
+    # Re-read under a row lock so concurrent writers rebuild only once
+    state = db.get(models.PayrollStatsState, 1, with_for_update=True, populate_existing=True)
+    if state is None:
+        state = models.PayrollStatsState(id=1)
+        db.add(state)
+    if state.schedule_key != key:
+        _rebuild(db, key, state)
+
+
+def _rebuild(db: Session, key: str, state: models.PayrollStatsState):
+    from .crud import _latest_employee_taxes  # crud imports this module
+
+    latest = _latest_employee_taxes(db)
+    statement = (
+        select(
+            models.Employee.years_of_experience,
+            models.Employee.salary,
+            latest.c.calculated_tax,
+            latest.c.tax_rate,
+        )
+        .join(latest, latest.c.employee_id == models.Employee.employee_id)
+        .execution_options(yield_per=REFRESH_CHUNK_SIZE)
+    )
+
+    for model in (models.PayrollBracketStat, models.PayrollExperienceStat, models.PayrollRateBucket):
+        db.execute(delete(model))
+    for rows in db.execute(statement).partitions():
+        record_employee_taxes(db, *zip(*rows))
+    state.schedule_key = key
+    state.refreshed_at = datetime.utcnow()
+
+
+def refresh(db: Session):
+    """Rebuild every aggregate from the live tables"""
+    state = db.get(models.PayrollStatsState, 1, with_for_update=True)
+    if state is None:
+        state = models.PayrollStatsState(id=1)
+        db.add(state)
+    _rebuild(db, schedule_key(), state)
+    db.commit()
+
+
+def _totals(count: int, salary: float, tax: float) -> dict:
+    return {
+        "employee_count": count,
+        "total_salary": round(salary, 2),
+        "total_tax": round(tax, 2),
+        "average_tax_rate": round(tax / salary * 100, 2) if salary else 0.0,
+    }
+
+
+def summary(db: Session) -> dict:
+    """Company-wide totals (every employee is in exactly one experience band)"""
+    stat = models.PayrollExperienceStat
+    count, salary, tax = db.execute(
+        select(func.sum(stat.employee_count), func.sum(stat.total_salary), func.sum(stat.total_tax))
+    ).one()
+    return _totals(count or 0, salary or 0.0, tax or 0.0)
+
+
+def bracket_stats(db: Session) -> List[dict]:
+    """Totals per slab of the current default schedule"""
+    schedule = tax_engine.get_schedule()
+    rows = db.scalars(select(models.PayrollBracketStat).order_by(models.PayrollBracketStat.bracket_index))
+    result = []
+    for row in rows:
+        if row.employee_count == 0:
+            continue
+        bracket = schedule.brackets[row.bracket_index] if row.bracket_index >= 0 else None
+        result.append({
+            "bracket_index": row.bracket_index,
+            "min": bracket["min"] if bracket else None,
+            "max": bracket["max"] if bracket and bracket["max"] != float("inf") else None,
+            "rate": bracket["rate"] if bracket else 0.0,
+            **_totals(row.employee_count, row.total_salary, row.total_tax),
+        })
+    return result
+
+
+def experience_stats(db: Session) -> List[dict]:
+    """Totals per years-of-experience band"""
+    rows = db.scalars(select(models.PayrollExperienceStat).order_by(models.PayrollExperienceStat.band))
+    return [
+        {
+            "band": band_label(row.band),
+            "min_years": EXPERIENCE_BANDS[row.band][0],
+            "max_years": EXPERIENCE_BANDS[row.band][1],
+            **_totals(row.employee_count, row.total_salary, row.total_tax),
+        }
+        for row in rows
+        if row.employee_count
+    ]
+
+
+def rate_percentiles(db: Session, percentiles: Sequence[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank percentiles of the effective tax rate, from the histogram"""
+    rows = db.execute(
+        select(models.PayrollRateBucket.bucket, models.PayrollRateBucket.employee_count)
+        .where(models.PayrollRateBucket.employee_count > 0)
+        .order_by(models.PayrollRateBucket.bucket)
+    ).all()
+    if not rows:
+        return {f"p{p:g}": None for p in percentiles}
+    buckets = np.array([bucket for bucket, _ in rows])
+    cumulative = np.cumsum([count for _, count in rows])
+    result = {}
+    for p in percentiles:
+        rank = max(int(np.ceil(p / 100 * cumulative[-1])), 1)
+        bucket = buckets[np.searchsorted(cumulative, rank)]
+        result[f"p{p:g}"] = round(float(bucket) * RATE_BUCKET_WIDTH, 2)
+    return result
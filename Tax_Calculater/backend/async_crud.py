@@ -0,0 +1,95 @@
+"""
+Async CRUD operations for the FastAPI handlers
+
+Each function runs the matching query from crud on an AsyncSession via
+run_sync, so the query logic lives in one place while the I/O goes through
+the async driver (asyncpg / aiosqlite) without blocking the event loop.
+"""
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, schemas
+
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    """Get user by username"""
+    return await db.run_sync(crud.get_user_by_username, username)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    """Get user by email"""
+    return await db.run_sync(crud.get_user_by_email, email)
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    """Create new user"""
+    return await db.run_sync(crud.create_user, user, hashed_password)
+
+async def get_employee_by_tax_number(db: AsyncSession, tax_number: str):
+    """Get employee by tax number"""
+    return await db.run_sync(crud.get_employee_by_tax_number, tax_number)
+
+async def create_employee(db: AsyncSession, employee: schemas.EmployeeCreate):
+    """Create new employee and return the instance"""
+    return await db.run_sync(crud.create_employee, employee)
+
+async def create_employee_tax(db: AsyncSession, employee_id: int, salary: float):
+    """Calculate tax for employee and save to employee_taxes table"""
+    return await db.run_sync(crud.create_employee_tax, employee_id, salary)
+
+async def create_employees_bulk(db: AsyncSession, rows: List[Tuple[int, schemas.EmployeeCreate]]):
+    """Register many employees and their taxes in one transaction"""
+    return await db.run_sync(crud.create_employees_bulk, rows)
+
+async def get_employee_with_tax(db: AsyncSession, employee_id: int):
+    """Get employee and their latest tax info"""
+    return await db.run_sync(crud.get_employee_with_tax, employee_id)
+
+async def get_employees(db: AsyncSession, limit: Optional[int] = None, after_id: Optional[int] = None):
+    """Get a page of employees ordered by employee_id"""
+    return await db.run_sync(crud.get_employees, limit, after_id)
+
+async def get_employees_with_latest_tax(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.EmployeeFilter] = None,
+    sort: str = "employee_id",
+    descending: bool = False
+):
+    """Get a filtered, sorted page of employees with their latest tax info"""
+    return await db.run_sync(crud.get_employees_with_latest_tax, limit, after, filters, sort, descending)
+
+async def employee_export_statement(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.EmployeeFilter] = None,
+    sort: str = "employee_id",
+    descending: bool = False
+):
+    """Column-only select of employees and their latest tax"""
+    return await db.run_sync(crud.employee_export_statement, limit, after, filters, sort, descending)
+
+async def create_tax_record(db: AsyncSession, tax_record: schemas.TaxRecordCreate, user_id: int):
+    """Create a tax record for a user"""
+    return await db.run_sync(crud.create_tax_record, tax_record, user_id)
+
+async def get_tax_records(db: AsyncSession, user_id: int, limit: int = 100, after: Optional[tuple] = None):
+    """Get a page of tax records for a user"""
+    return await db.run_sync(crud.get_tax_records, user_id, limit, after)
+
+async def get_tax_record_summary(db: AsyncSession, user_id: int):
+    """Totals for a user's tax records, overall and per tax year"""
+    return await db.run_sync(crud.get_tax_record_summary, user_id)
+
+async def get_tax_record(db: AsyncSession, record_id: int, user_id: int):
+    """Get specific tax record for a user"""
+    return await db.run_sync(crud.get_tax_record, record_id, user_id)
+
+async def update_tax_record(db: AsyncSession, record_id: int, user_id: int, tax_record: schemas.TaxRecordUpdate):
+    """Update existing tax record"""
+    return await db.run_sync(crud.update_tax_record, record_id, user_id, tax_record)
+
+async def delete_tax_record(db: AsyncSession, record_id: int, user_id: int):
+    """Delete tax record"""
+    return await db.run_sync(crud.delete_tax_record, record_id, user_id)
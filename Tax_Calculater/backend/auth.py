@@ -1,18 +1,27 @@
 """
 Authentication utilities - JWT tokens and password hashing
+
+The JWT and passlib libraries are imported on first use (or by warm_up())
+rather than with this module.
 """
+import hashlib
 import os
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
-from . import crud, models, schemas
-from .database import get_db
+from . import async_crud, crud, models
+from .cache import TTLCache
+from .database import get_async_db
+from .metrics import JWT_DECODE_DURATION
+from .passwords import PasswordService
 
 load_dotenv()
 
@@ -21,19 +30,97 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# JWT library: "jose" (python-jose) or "pyjwt" (PyJWT, optional and faster)
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose").strip().lower()
+if JWT_BACKEND not in ("jose", "pyjwt"):
+    raise ValueError(f"Unknown JWT_BACKEND: {JWT_BACKEND}")
+
+@lru_cache(maxsize=None)
+def _jwt():
+    """(encode, decode, error types) of the configured JWT library"""
+    if JWT_BACKEND == "pyjwt":
+        try:
+            import jwt as pyjwt
+        except ImportError:
+            raise ValueError("JWT_BACKEND=pyjwt needs PyJWT installed")
+        return pyjwt.encode, pyjwt.decode, (pyjwt.PyJWTError,)
+    from jose import JWTError, jwt
+    return jwt.encode, jwt.decode, (JWTError,)
+
+@lru_cache(maxsize=None)
+def _pwd_context():
+    """Password hashing context"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def warm_up():
+    """Import the JWT and hashing libraries now (e.g. before forking workers)"""
+    _jwt()
+    _pwd_context()
 
 # Token scheme
 security = HTTPBearer()
 
+# Usernames (comma-separated) allowed to run operator endpoints such as
+# recompute and the analytics rebuild. Empty means nobody, via the API.
+ADMIN_USERNAMES = frozenset(
+    name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()
+)
+
+# Authenticated-user cache, keyed by token subject (username).
+# Writes through this process's ORM session drop the entry at once. Anything
+# else (another worker, raw SQL) is only seen when the entry expires, so the
+# TTL is how long a deactivated user can keep using a token.
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "10"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+user_cache = TTLCache("users", max_size=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+# Verified tokens, keyed by sha256 of the token and kept until the token's exp.
+# Holds only the subject, so deactivation is still seen through user_cache.
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+token_cache = TTLCache("tokens", max_size=TOKEN_CACHE_MAX_SIZE, ttl=None)
+
+# Bumped by every invalidation; a lookup that started before one must not cache its result
+_user_cache_generation = 0
+
+def invalidate_user(username: str):
+    """Drop a user from the cache (call after deactivating or editing them)"""
+    global _user_cache_generation
+    _user_cache_generation += 1
+    user_cache.invalidate(username)
+
+def invalidate_all_users():
+    """Drop every cached user"""
+    global _user_cache_generation
+    _user_cache_generation += 1
+    user_cache.clear()
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    """Invalidate on any ORM update/delete of a user, including renames"""
+    invalidate_user(target.username)
+    for old_username in inspect(target).attrs.username.history.deleted:
+        invalidate_user(old_username)
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_on_bulk_user_write(orm_execute_state):
+    """update(User) / delete(User) statements skip the mapper events; their rows are unknown, so drop everyone"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is models.User:
+            invalidate_all_users()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password against hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash password"""
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
+
+# Runs bcrypt on a bounded executor for the async request handlers
+password_service = PasswordService(verify_password, get_password_hash)
 
 def authenticate_user(db: Session, username: str, password: str):
     """Authenticate user credentials"""
@@ -44,6 +131,15 @@ def authenticate_user(db: Session, username: str, password: str):
         return False
     return user
 
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    """Authenticate user credentials without blocking the event loop on bcrypt"""
+    user = await async_crud.get_user_by_username(db, username)
+    if not user:
+        return False
+    if not await password_service.verify(password, user.hashed_password):
+        return False
+    return user
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -52,12 +148,36 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encode, _, _ = _jwt()
+    encoded_jwt = encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def verify_token(token: str) -> Optional[str]:
+    """Username from a valid token, or None; verified tokens are cached until they expire"""
+    key = hashlib.sha256(token.encode()).digest()
+    username = token_cache.get(key)
+    if username is not None:
+        return username
+
+    _, decode, errors = _jwt()
+    try:
+        with JWT_DECODE_DURATION.time():
+            payload = decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except errors:
+        return None
+    username = payload.get("sub")
+    if not isinstance(username, str):
+        return None
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            token_cache.set(key, username, ttl=remaining)
+    return username
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current authenticated user from JWT token"""
     credentials_exception = HTTPException(
@@ -66,23 +186,31 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(username=username)
-    except JWTError:
+    username = verify_token(credentials.credentials)
+    if username is None:
         raise credentials_exception
     
-    user = crud.get_user_by_username(db, username=token_data.username)
+    user = user_cache.get(username)
     if user is None:
-        raise credentials_exception
+        generation = _user_cache_generation
+        user = await async_crud.get_user_by_username(db, username=username)
+        if user is None:
+            raise credentials_exception
+        # Detach so later commits on this session don't expire the cached copy
+        db.expunge(user)
+        # Skip caching a row read before a concurrent invalidation; it may be stale
+        if generation == _user_cache_generation:
+            user_cache.set(username, user)
     return user
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+async def get_current_admin_user(current_user: models.User = Depends(get_current_active_user)):
+    """Get current active user, who must be listed in ADMIN_USERNAMES"""
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     return current_user
\ No newline at end of file
@@ -1,9 +1,13 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from . import models, schemas
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, func, insert, or_, select
+from . import analytics, models, schemas, tax_engine
 from .auth import get_password_hash
+from .cache import TTLCache
+from .metrics import TAX_CALCULATION_DURATION
 from datetime import datetime
-from typing import List, Optional
+import os
+import time
+from typing import List, Optional, Tuple
 from pydantic import BaseModel
 
 def get_employee_by_tax_number(db: Session, tax_number: str):
@@ -26,17 +30,117 @@ def create_employee(db: Session, employee: schemas.EmployeeCreate):
 
 def create_employee_tax(db: Session, employee_id: int, salary: float):
     """Calculate tax for employee and save to employee_taxes table"""
+    analytics.ensure_current(db)
     tax_result = calculate_tax(salary)
+    employee = db.get(models.Employee, employee_id)
+    previous = (
+        db.query(models.EmployeeTax)
+        .filter(models.EmployeeTax.employee_id == employee_id)
+        .order_by(models.EmployeeTax.created_at.desc(), models.EmployeeTax.id.desc())
+        .first()
+    )
     db_tax = models.EmployeeTax(
         employee_id=employee_id,
         calculated_tax=tax_result["tax_paid"],
         tax_rate=tax_result["tax_rate"]
     )
     db.add(db_tax)
+
+    # Keep the payroll aggregates in step: the new row supersedes the previous latest
+    if previous is not None:
+        analytics.record_employee_taxes(
+            db, [employee.years_of_experience], [employee.salary],
+            [previous.calculated_tax], [previous.tax_rate], sign=-1
+        )
+    analytics.record_employee_taxes(
+        db, [employee.years_of_experience], [salary], [tax_result["tax_paid"]], [tax_result["tax_rate"]]
+    )
     db.commit()
     db.refresh(db_tax)
     return db_tax
 
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+BULK_CHUNK_SIZE = 5000
+
+def get_existing_tax_numbers(db: Session, tax_numbers: List[str]) -> set:
+    """Return the subset of tax_numbers that are already registered"""
+    existing = set()
+    for start in range(0, len(tax_numbers), BULK_CHUNK_SIZE):
+        chunk = tax_numbers[start:start + BULK_CHUNK_SIZE]
+        existing.update(db.scalars(
+            select(models.Employee.tax_number).where(models.Employee.tax_number.in_(chunk))
+        ))
+    return existing
+
+def create_employees_bulk(db: Session, rows: List[Tuple[int, schemas.EmployeeCreate]]):
+    """
+    Register many employees and their EmployeeTax rows in one transaction.
+
+    ``rows`` pairs each employee with its position in the upload. Rows whose
+    tax_number is repeated in the upload or already registered are skipped
+    and reported; everything else is inserted with executemany + RETURNING.
+    Returns (created, errors).
+    """
+    errors = []
+    seen = set()
+    unique_rows = []
+    for row, employee in rows:
+        if employee.tax_number in seen:
+            errors.append({"row": row, "tax_number": employee.tax_number, "detail": "Duplicate tax number in upload"})
+        else:
+            seen.add(employee.tax_number)
+            unique_rows.append((row, employee))
+
+    existing = get_existing_tax_numbers(db, [employee.tax_number for _, employee in unique_rows])
+    new_rows = []
+    for row, employee in unique_rows:
+        if employee.tax_number in existing:
+            errors.append({"row": row, "tax_number": employee.tax_number, "detail": "Employee with this tax number already exists"})
+        else:
+            new_rows.append((row, employee))
+
+    if not new_rows:
+        return [], errors
+
+    analytics.ensure_current(db)
+    now = datetime.utcnow()
+    employee_ids = db.scalars(
+        insert(models.Employee).returning(models.Employee.employee_id, sort_by_parameter_order=True),
+        [
+            {
+                "full_name": employee.full_name,
+                "tax_number": employee.tax_number,
+                "years_of_experience": employee.years_of_experience,
+                "skills": employee.skills,
+                "salary": employee.salary,
+                "created_at": now,
+            }
+            for _, employee in new_rows
+        ],
+    ).all()
+
+    taxes = calculate_tax_many([employee.salary for _, employee in new_rows])
+    db.execute(insert(models.EmployeeTax), [
+        {"employee_id": employee_id, "calculated_tax": tax_paid, "tax_rate": tax_rate, "created_at": now}
+        for employee_id, tax_paid, tax_rate in zip(
+            employee_ids, taxes["tax_paid"].tolist(), taxes["tax_rate"].tolist()
+        )
+    ])
+    analytics.record_employee_taxes(
+        db,
+        [employee.years_of_experience for _, employee in new_rows],
+        [employee.salary for _, employee in new_rows],
+        taxes["tax_paid"],
+        taxes["tax_rate"],
+    )
+    db.commit()
+
+    created = [
+        {"row": row, "employee_id": employee_id, "tax_number": employee.tax_number}
+        for (row, employee), employee_id in zip(new_rows, employee_ids)
+    ]
+    return created, errors
+
 def get_employee_with_tax(db: Session, employee_id: int):
     """Get employee and their latest tax info"""
     employee = db.query(models.Employee).filter(models.Employee.employee_id == employee_id).first()
@@ -45,10 +149,146 @@ def get_employee_with_tax(db: Session, employee_id: int):
     latest_tax = (
         db.query(models.EmployeeTax)
         .filter(models.EmployeeTax.employee_id == employee_id)
-        .order_by(models.EmployeeTax.created_at.desc())
+        .order_by(models.EmployeeTax.created_at.desc(), models.EmployeeTax.id.desc())
         .first()
     )
     return employee, latest_tax
+
+def get_employees(db: Session, limit: Optional[int] = None, after_id: Optional[int] = None):
+    """Get a page of employees ordered by employee_id (keyset pagination)"""
+    query = db.query(models.Employee)
+    if after_id is not None:
+        query = query.filter(models.Employee.employee_id > after_id)
+    return query.order_by(models.Employee.employee_id).limit(limit).all()
+
+# Sortable columns for employee listings; every sort pages on (column, employee_id)
+EMPLOYEE_SORT_COLUMNS = {
+    "employee_id": models.Employee.employee_id,
+    "full_name": models.Employee.full_name,
+    "salary": models.Employee.salary,
+    "years_of_experience": models.Employee.years_of_experience,
+    "created_at": models.Employee.created_at,
+}
+
+def _employee_filters(filters: Optional[schemas.EmployeeFilter]) -> list:
+    """WHERE conditions for an employee listing filter"""
+    if filters is None:
+        return []
+    conditions = []
+    if filters.name:
+        conditions.append(models.Employee.full_name.icontains(filters.name, autoescape=True))
+    if filters.skill:
+        conditions.append(models.Employee.skills.icontains(filters.skill, autoescape=True))
+    if filters.min_salary is not None:
+        conditions.append(models.Employee.salary >= filters.min_salary)
+    if filters.max_salary is not None:
+        conditions.append(models.Employee.salary <= filters.max_salary)
+    if filters.min_experience is not None:
+        conditions.append(models.Employee.years_of_experience >= filters.min_experience)
+    if filters.max_experience is not None:
+        conditions.append(models.Employee.years_of_experience <= filters.max_experience)
+    return conditions
+
+def _employee_order(sort: str, descending: bool):
+    column = EMPLOYEE_SORT_COLUMNS[sort]
+    if descending:
+        return column.desc(), models.Employee.employee_id.desc()
+    return column.asc(), models.Employee.employee_id.asc()
+
+def _employee_id_page(
+    limit: Optional[int],
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.EmployeeFilter] = None,
+    sort: str = "employee_id",
+    descending: bool = False
+):
+    """Select the employee_ids on one keyset page; ``after`` is the (sort value, employee_id) of the previous row"""
+    column = EMPLOYEE_SORT_COLUMNS[sort]
+    page = select(models.Employee.employee_id).where(*_employee_filters(filters))
+    if after is not None:
+        value, employee_id = after
+        if descending:
+            past_value, past_id = column < value, models.Employee.employee_id < employee_id
+        else:
+            past_value, past_id = column > value, models.Employee.employee_id > employee_id
+        page = page.where(past_id if sort == "employee_id" else or_(past_value, and_(column == value, past_id)))
+    return page.order_by(*_employee_order(sort, descending)).limit(limit)
+
+def _latest_employee_taxes(db: Session, employee_ids=None):
+    """Subquery with the most recent EmployeeTax row per employee"""
+    order = (models.EmployeeTax.created_at.desc(), models.EmployeeTax.id.desc())
+    if db.get_bind().dialect.name == "postgresql":
+        latest = (
+            select(models.EmployeeTax)
+            .distinct(models.EmployeeTax.employee_id)
+            .order_by(models.EmployeeTax.employee_id, *order)
+        )
+        if employee_ids is not None:
+            latest = latest.where(models.EmployeeTax.employee_id.in_(employee_ids))
+        return latest.subquery()
+    # Portable fallback (SQLite >= 3.25 and others): ROW_NUMBER() window
+    ranked = select(
+        models.EmployeeTax,
+        func.row_number().over(partition_by=models.EmployeeTax.employee_id, order_by=order).label("rn"),
+    )
+    if employee_ids is not None:
+        ranked = ranked.where(models.EmployeeTax.employee_id.in_(employee_ids))
+    ranked = ranked.subquery()
+    return select(ranked).where(ranked.c.rn == 1).subquery()
+
+def get_employees_with_latest_tax(
+    db: Session,
+    limit: Optional[int] = None,
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.EmployeeFilter] = None,
+    sort: str = "employee_id",
+    descending: bool = False
+):
+    """Get a filtered, sorted page of employees with their latest tax info in a single query"""
+    employee_ids = None
+    if limit is not None or after is not None or filters is not None:
+        # Only rank the tax rows of the employees on this page
+        employee_ids = _employee_id_page(limit, after, filters, sort, descending)
+    latest_tax = aliased(models.EmployeeTax, _latest_employee_taxes(db, employee_ids))
+    query = (
+        db.query(models.Employee, latest_tax)
+        .outerjoin(latest_tax, latest_tax.employee_id == models.Employee.employee_id)
+    )
+    if employee_ids is not None:
+        query = query.filter(models.Employee.employee_id.in_(employee_ids))
+    return query.order_by(*_employee_order(sort, descending)).all()
+
+def employee_export_statement(
+    db: Session,
+    limit: Optional[int] = None,
+    after: Optional[tuple] = None,
+    filters: Optional[schemas.EmployeeFilter] = None,
+    sort: str = "employee_id",
+    descending: bool = False
+):
+    """Column-only select of employees and their latest tax, for streaming and columnar pages"""
+    employee_ids = None
+    if limit is not None or after is not None or filters is not None:
+        employee_ids = _employee_id_page(limit, after, filters, sort, descending)
+    latest_tax = _latest_employee_taxes(db, employee_ids)
+    statement = (
+        select(
+            models.Employee.employee_id,
+            models.Employee.full_name,
+            models.Employee.tax_number,
+            models.Employee.years_of_experience,
+            models.Employee.skills,
+            models.Employee.salary,
+            models.Employee.created_at,
+            latest_tax.c.calculated_tax,
+            latest_tax.c.tax_rate,
+            latest_tax.c.created_at.label("tax_created_at"),
+        )
+        .outerjoin_from(models.Employee, latest_tax, latest_tax.c.employee_id == models.Employee.employee_id)
+    )
+    if employee_ids is not None:
+        statement = statement.where(models.Employee.employee_id.in_(employee_ids))
+    return statement.order_by(*_employee_order(sort, descending))
 """
 CRUD operations for database models
 """
@@ -65,9 +305,10 @@ def get_user_by_email(db: Session, email: str):
     """Get user by email"""
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    """Create new user"""
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    """Create new user (pass hashed_password if it was already hashed off-thread)"""
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -78,47 +319,43 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
-def calculate_tax(gross_salary: float) -> dict:
-    """
-    Calculate tax based on progressive tax brackets
-    Tax Brackets (Example - Indian Tax Slabs for FY 2023-24):
-    - 0 to 2,50,000: 0%
-    - 2,50,001 to 5,00,000: 5%
-    - 5,00,001 to 10,00,000: 20%
-    - Above 10,00,000: 30%
-    """
-    tax_brackets = [
-        {"min": 0, "max": 250000, "rate": 0.0},
-        {"min": 250001, "max": 500000, "rate": 0.05},
-        {"min": 500001, "max": 1000000, "rate": 0.20},
-        {"min": 1000001, "max": float('inf'), "rate": 0.30}
-    ]
-    
-    total_tax = 0.0
-
-    for bracket in tax_brackets:
-        lower = bracket["min"]
-        upper = bracket["max"]
-        rate = bracket["rate"]
+# Memoized results, keyed by rule-set version so a rules change never serves stale numbers
+TAX_RESULT_CACHE_SIZE = int(os.getenv("TAX_RESULT_CACHE_SIZE", "50000"))
+tax_result_cache = TTLCache("tax_results", max_size=TAX_RESULT_CACHE_SIZE, ttl=None)
 
-        if gross_salary > lower:
-            taxable_amount = min(gross_salary, upper) - lower
-            tax = taxable_amount * rate
-            total_tax += tax
+def calculate_tax(gross_salary: float, tax_year: Optional[int] = None, regime: Optional[str] = None) -> dict:
+    """
+    Calculate tax using the compiled rules for (regime, tax_year)
 
-    net_salary = gross_salary - total_tax
-    tax_rate = (total_tax / gross_salary * 100) if gross_salary > 0 else 0
+    Rules come from tax_engine's registry (tax_rules/*.json). The regime
+    defaults to TAX_DEFAULT_REGIME ("legacy": the original FY 2023-24 example
+    slabs) and the tax year to the current financial year. Results are
+    served from a bounded LRU cache when the same inputs repeat.
+    """
+    regime = regime or tax_engine.DEFAULT_REGIME
+    tax_year = tax_year if tax_year is not None else tax_engine.current_tax_year()
+    key = (tax_engine.registry.version, regime, tax_year, gross_salary)
+    start = time.perf_counter()
+    result = tax_result_cache.get(key)
+    cache = "hit" if result is not None else "miss"
+    if result is None:
+        schedule = tax_engine.get_schedule(regime, tax_year)
+        result = schedule.calculate(gross_salary)
+        result["tax_brackets"] = schedule.brackets
+        result["regime"] = schedule.regime
+        tax_result_cache.set(key, result)
+    # Callers get their own dict; the cached one is never handed out
+    result = dict(result)
+    TAX_CALCULATION_DURATION.observe(time.perf_counter() - start, cache=cache)
+    return result
 
-    return {
-        "tax_paid": round(total_tax, 2),
-        "net_salary": round(net_salary, 2),
-        "tax_rate": round(tax_rate, 2),
-        "tax_brackets": tax_brackets
-    }
+def calculate_tax_many(gross_salaries, tax_years=None, regime: Optional[str] = None) -> dict:
+    """Vectorized calculate_tax: returns arrays of tax_paid, net_salary and tax_rate"""
+    return tax_engine.calculate_many(gross_salaries, tax_years, regime)
 
 
 def create_tax_record(db: Session, tax_record: schemas.TaxRecordCreate, user_id: int):
-    tax_calc = calculate_tax(tax_record.gross_salary)
+    tax_calc = calculate_tax(tax_record.gross_salary, tax_record.tax_year)
     now = datetime.utcnow()
     db_record = models.TaxRecord(
         user_id=user_id,
@@ -134,11 +371,71 @@ def create_tax_record(db: Session, tax_record: schemas.TaxRecordCreate, user_id:
     db.refresh(db_record)
     return db_record
 
-def get_tax_records(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    """Get all tax records for a user"""
-    return db.query(models.TaxRecord).filter(
-        models.TaxRecord.user_id == user_id
-    ).offset(skip).limit(limit).all()
+def get_tax_records(db: Session, user_id: int, limit: int = 100, after: Optional[tuple] = None):
+    """Get a page of tax records for a user ordered by (created_at, id)"""
+    query = db.query(models.TaxRecord).filter(models.TaxRecord.user_id == user_id)
+    if after is not None:
+        created_at, record_id = after
+        query = query.filter(or_(
+            models.TaxRecord.created_at > created_at,
+            and_(models.TaxRecord.created_at == created_at, models.TaxRecord.id > record_id)
+        ))
+    return query.order_by(models.TaxRecord.created_at, models.TaxRecord.id).limit(limit).all()
+
+def tax_record_export_statement(user_id: int, limit: Optional[int] = None, after: Optional[tuple] = None):
+    """Column-only select of a user's tax records, for streaming and binary pages"""
+    statement = (
+        select(
+            models.TaxRecord.id,
+            models.TaxRecord.gross_salary,
+            models.TaxRecord.tax_paid,
+            models.TaxRecord.net_salary,
+            models.TaxRecord.tax_year,
+            models.TaxRecord.created_at,
+            models.TaxRecord.updated_at,
+        )
+        .where(models.TaxRecord.user_id == user_id)
+        .order_by(models.TaxRecord.created_at, models.TaxRecord.id)
+        .limit(limit)
+    )
+    if after is not None:
+        created_at, record_id = after
+        statement = statement.where(or_(
+            models.TaxRecord.created_at > created_at,
+            and_(models.TaxRecord.created_at == created_at, models.TaxRecord.id > record_id)
+        ))
+    return statement
+
+def get_tax_record_summary(db: Session, user_id: int) -> dict:
+    """Totals for a user's tax records, overall and per tax year, from SQL aggregates"""
+    # Reads only the user's rows through ix_tax_records_user_id_tax_year, which
+    # also delivers them grouped by year (migration 0002; before it this scanned)
+    rows = db.execute(
+        select(
+            models.TaxRecord.tax_year,
+            func.count(models.TaxRecord.id),
+            func.sum(models.TaxRecord.gross_salary),
+            func.sum(models.TaxRecord.tax_paid),
+            func.sum(models.TaxRecord.net_salary),
+        )
+        .where(models.TaxRecord.user_id == user_id)
+        .group_by(models.TaxRecord.tax_year)
+        .order_by(models.TaxRecord.tax_year)
+    ).all()
+
+    def totals(record_count, total_gross, total_tax, total_net):
+        return {
+            "record_count": record_count,
+            "total_gross_salary": round(total_gross or 0.0, 2),
+            "total_tax_paid": round(total_tax or 0.0, 2),
+            "total_net_salary": round(total_net or 0.0, 2),
+            "average_tax_rate": round(total_tax / total_gross * 100, 2) if total_gross else 0.0,
+        }
+
+    # One row per tax year, so summing them here stays cheap
+    summary = totals(*(sum(row[i] or 0 for row in rows) for i in range(1, 5)))
+    summary["by_year"] = [{"tax_year": row[0], **totals(*row[1:])} for row in rows]
+    return summary
 
 def get_tax_record(db: Session, record_id: int, user_id: int):
     """Get specific tax record for a user"""
@@ -154,9 +451,12 @@ def update_tax_record(db: Session, record_id: int, user_id: int, tax_record: sch
     
     update_data = tax_record.dict(exclude_unset=True)
     
-    # Recalculate tax if gross_salary is updated
-    if "gross_salary" in update_data:
-        tax_calc = calculate_tax(update_data["gross_salary"])
+    # Recalculate tax if gross_salary or tax_year is updated
+    if "gross_salary" in update_data or "tax_year" in update_data:
+        tax_calc = calculate_tax(
+            update_data.get("gross_salary", db_record.gross_salary),
+            update_data.get("tax_year", db_record.tax_year)
+        )
         update_data.update({
             "tax_paid": tax_calc["tax_paid"],
             "net_salary": tax_calc["net_salary"]
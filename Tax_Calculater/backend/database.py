@@ -1,23 +1,240 @@
-"""Database configuration and session management"""
+"""
+Database configuration and session management
+
+Engines are created on first use, not at import, so importing the app (or a
+model) needs neither DATABASE_URL nor a reachable database. ``engine``,
+``async_engine``, ``SessionLocal`` and ``AsyncSessionLocal`` are still
+importable by name; the first access builds them.
+"""
 import os
-from sqlalchemy import create_engine, Column, Integer, Float, Date
+import threading
+import time
+from sqlalchemy import create_engine, event, make_url, Column, Integer, Float, Date
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from dotenv import load_dotenv
 
+from .metrics import instrument_engine
+
 # Load environment variables from .env file in the backend directory, no matter where the command is run
 load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 
-# Database URL from environment variables (no SQLite fallback)
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL not set in .env file")
+def database_url() -> str:
+    """DATABASE_URL from the environment (no SQLite fallback)"""
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise ValueError("DATABASE_URL not set in .env file")
+    return url
+
+# Async drivers for each sync dialect we support
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching async driver"""
+    sync_url = make_url(url)
+    backend = sync_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return sync_url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def async_database_url() -> str:
+    # Can be set explicitly (e.g. when asyncpg needs different query params)
+    return os.getenv("ASYNC_DATABASE_URL") or to_async_url(database_url())
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+# Connection pool tuning. "null" opens a connection per checkout, which is what
+# you want behind PgBouncer in transaction mode. Pool sizing is ignored for
+# SQLite, which manages its own pool.
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", "true")
+# Per-statement timeout in milliseconds (Postgres only, 0 disables)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+class PoolStats:
+    """Checkout/wait counters for one engine's connection pool"""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.waits += 1
+        self.wait_seconds_total += seconds
+        if seconds > self.wait_seconds_max:
+            self.wait_seconds_max = seconds
+
+    def attach(self, target):
+        """Count pool events for an Engine (or the sync side of an AsyncEngine)"""
+        event.listen(target, "connect", lambda *args: self._incr("connects"))
+        event.listen(target, "checkout", lambda *args: self._incr("checkouts"))
+        event.listen(target, "checkin", lambda *args: self._incr("checkins"))
+        event.listen(target, "invalidate", lambda *args: self._incr("invalidations"))
+
+    def _incr(self, counter: str):
+        setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool) -> dict:
+        stats = {
+            "pool_class": type(pool).__name__ if pool is not None else None,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "waits": self.waits,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.waits, 6) if self.waits else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        return stats
+
+def _timed_pool_class(base, stats: PoolStats):
+    """
+    Subclass a QueuePool so checkouts that had to wait for a connection are
+    recorded. A checkout only waits when every connection, overflow included,
+    is in use; the others (an idle connection, or a new one opened within
+    max_overflow) are not counted, so waits measure contention alone.
+    """
+    def _do_get(self):
+        if self._max_overflow < 0 or self.checkedout() < self.size() + self._max_overflow:
+            return base._do_get(self)
+        start = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            stats.record_wait(time.perf_counter() - start)
+    # pool.recreate() (engine.dispose) reuses self.__class__, so stats survive it
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+def engine_options(url: str, is_async: bool, stats: PoolStats) -> dict:
+    """create_engine keyword arguments built from the DB_* environment"""
+    backend = make_url(url).get_backend_name()
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    connect_args = {}
 
-# Create SessionLocal class for database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if DB_POOL_MODE == "null":
+        options["poolclass"] = NullPool
+        if is_async and backend == "postgresql":
+            # PgBouncer transaction pooling can't keep prepared statements
+            connect_args["statement_cache_size"] = 0
+    elif DB_POOL_MODE != "queue":
+        raise ValueError(f"Unknown DB_POOL_MODE: {DB_POOL_MODE}")
+    elif backend != "sqlite":
+        options.update({
+            "poolclass": _timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, stats),
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+        })
+
+    if DB_STATEMENT_TIMEOUT_MS and backend == "postgresql":
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+sync_pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+# Unbound until the first engine is created; see get_engine()
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+_async_session_factory = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+def get_engine():
+    """Sync engine (scripts, migrations, run_sync handlers), created on first call"""
+    engine = _engines.get("sync")
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get("sync")
+            if engine is None:
+                url = database_url()
+                engine = create_engine(url, **engine_options(url, False, sync_pool_stats))
+                sync_pool_stats.attach(engine)
+                instrument_engine(engine, "sync")
+                _session_factory.configure(bind=engine)
+                _engines["sync"] = engine
+    return engine
+
+def get_async_engine():
+    """Async engine used by the FastAPI handlers, created on first call"""
+    engine = _engines.get("async")
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get("async")
+            if engine is None:
+                url = async_database_url()
+                engine = create_async_engine(url, **engine_options(url, True, async_pool_stats))
+                async_pool_stats.attach(engine.sync_engine)
+                instrument_engine(engine.sync_engine, "async")
+                _async_session_factory.configure(bind=engine)
+                _engines["async"] = engine
+    return engine
+
+def dispose_engines(close: bool = True):
+    """Dispose whichever engines exist; close=False after fork leaves the parent's connections alone"""
+    if "sync" in _engines:
+        _engines["sync"].dispose(close=close)
+    if "async" in _engines:
+        _engines["async"].sync_engine.dispose(close=close)
+
+async def close_engines():
+    """Close every pooled connection (application shutdown)"""
+    if "async" in _engines:
+        await _engines["async"].dispose()
+    if "sync" in _engines:
+        _engines["sync"].dispose()
+
+def SessionLocal():
+    """New sync Session bound to the (lazily created) engine"""
+    get_engine()
+    return _session_factory()
+
+def AsyncSessionLocal():
+    """New AsyncSession bound to the (lazily created) async engine"""
+    get_async_engine()
+    return _async_session_factory()
+
+def __getattr__(name):
+    # Keeps `from .database import engine` working without import-time connections
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "DATABASE_URL":
+        return database_url()
+    if name == "ASYNC_DATABASE_URL":
+        return async_database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Create Base class for models
 Base = declarative_base()
@@ -30,3 +247,17 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Database dependency that yields an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def pool_statistics() -> dict:
+    """Checkout and wait statistics for both engines' pools"""
+    sync_engine = _engines.get("sync")
+    async_engine = _engines.get("async")
+    return {
+        "mode": DB_POOL_MODE,
+        "sync": sync_pool_stats.snapshot(sync_engine.pool if sync_engine else None),
+        "async": async_pool_stats.snapshot(async_engine.sync_engine.pool if async_engine else None),
+    }
@@ -0,0 +1,184 @@
+"""
+Streaming NDJSON / CSV / Arrow / Parquet export of employees and tax records
+
+Arrow IPC and Parquet are built column-wise from the cursor's row tuples
+into record batches whose schema comes from the select's column types, so
+no ORM objects or per-row dicts are created. pyarrow is optional and only
+imported when one of those formats is requested.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Sequence, Union
+
+from fastapi import HTTPException
+from sqlalchemy import Boolean, DateTime, Float, Integer
+from sqlalchemy.sql import Select
+
+from .database import AsyncSessionLocal
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/x-parquet",
+}
+
+# Accept header media types -> binary format
+BINARY_ACCEPT = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.parquet": "parquet",
+}
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """The binary format asked for in an Accept header, or None for the default"""
+    for part in (accept or "").split(","):
+        fmt = BINARY_ACCEPT.get(part.split(";")[0].strip().lower())
+        if fmt:
+            return fmt
+    return None
+
+
+def require_pyarrow():
+    """Import pyarrow, or tell the client the format is unavailable (406)"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise HTTPException(status_code=406, detail="Arrow and Parquet output need pyarrow installed on the server")
+    return pyarrow
+
+
+def arrow_schema(statement: Select):
+    """Arrow schema matching the columns of a Core select"""
+    pa = require_pyarrow()
+    fields = []
+    for column in statement.selected_columns:
+        if isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def record_batch(schema, rows: Sequence):
+    """Transpose row tuples into one Arrow record batch"""
+    pa = require_pyarrow()
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+    )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        # Parquet records absolute offsets in its footer
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _binary_writer(fmt: str, sink: _ChunkSink, schema):
+    pa = require_pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.ParquetWriter(sink, schema)
+    return pa.ipc.new_stream(sink, schema)
+
+
+def binary_page(statement: Select, rows: Sequence, fmt: str) -> bytes:
+    """Serialize already-fetched rows of ``statement`` as one Arrow stream or Parquet file"""
+    schema = arrow_schema(statement)
+    sink = _ChunkSink()
+    writer = _binary_writer(fmt, sink, schema)
+    writer.write_batch(record_batch(schema, rows))
+    writer.close()
+    return sink.drain()
+
+
+def _json_default(value):
+    """JSON encoder for the column types we export"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _ndjson_chunk(keys, rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(keys, row)), default=_json_default) + "\n" for row in rows
+    )
+
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [v.isoformat() if isinstance(v, (datetime, date)) else v for v in row] for row in rows
+    )
+    return buffer.getvalue()
+
+
+async def stream_rows(statement: Select, fmt: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[Union[str, bytes]]:
+    """
+    Execute a Core select with a server-side cursor and yield it as text.
+
+    The generator owns its session so the connection stays open for as long
+    as the response is streaming, and only ``chunk_size`` rows are held in
+    memory at any time. No ORM objects are created.
+    """
+    if fmt in ("arrow", "parquet"):
+        async for chunk in _stream_binary(statement, fmt, chunk_size):
+            yield chunk
+        return
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement.execution_options(yield_per=chunk_size))
+        keys = list(result.keys())
+        if fmt == "csv":
+            yield _csv_chunk([keys])
+        async for rows in result.partitions():
+            yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(keys, rows)
+
+
+async def _stream_binary(statement: Select, fmt: str, chunk_size: int) -> AsyncIterator[bytes]:
+    """One record batch (Parquet row group) per cursor partition"""
+    schema = arrow_schema(statement)
+    sink = _ChunkSink()
+    writer = _binary_writer(fmt, sink, schema)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            writer.write_batch(record_batch(schema, rows))
+            yield sink.drain()
+    writer.close()
+    yield sink.drain()
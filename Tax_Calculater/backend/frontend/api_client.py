@@ -0,0 +1,106 @@
+"""
+Shared HTTP client for the Streamlit frontend
+
+One pooled requests.Session (keep-alive, timeouts, retries) is shared by
+every rerun and every user session of the app. GET responses are cached
+per (endpoint, token) with st.cache_data and dropped on any mutation, so a
+widget interaction no longer re-downloads every page.
+"""
+import json
+import os
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+
+# (connect, read) timeouts in seconds
+CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "30"))
+API_RETRIES = int(os.getenv("API_RETRIES", "3"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+# How long a cached GET response may be reused, in seconds
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", "60"))
+
+
+class ApiResponse:
+    """The parts of a requests.Response the pages use (picklable, so it can be cached)"""
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class _NotCached(Exception):
+    """Carries a non-200 response out of the cached function so it is not stored"""
+
+    def __init__(self, response: ApiResponse):
+        self.response = response
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Process-wide session with a keep-alive connection pool"""
+    # Only idempotent methods are retried; POSTs fail fast
+    retry = Retry(
+        total=API_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "PUT", "DELETE"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=API_POOL_SIZE, pool_maxsize=API_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def request(method: str, endpoint: str, token: str = None, data=None, params=None) -> ApiResponse:
+    """Send one request through the shared session (raises requests.RequestException)"""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    response = get_session().request(
+        method,
+        f"{API_BASE_URL}{endpoint}",
+        headers=headers,
+        json=data,
+        params=params,
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+    )
+    return ApiResponse(response.status_code, response.text)
+
+
+@st.cache_data(ttl=API_CACHE_TTL, show_spinner=False)
+def _cached_get(endpoint: str, token: str = None) -> ApiResponse:
+    response = request("GET", endpoint, token)
+    if response.status_code != 200:
+        raise _NotCached(response)
+    return response
+
+
+def get(endpoint: str, token: str = None) -> ApiResponse:
+    """Cached GET; only 200 responses are cached"""
+    try:
+        return _cached_get(endpoint, token)
+    except _NotCached as e:
+        return e.response
+
+
+def send(method: str, endpoint: str, token: str = None, data=None, mutates: bool = True) -> ApiResponse:
+    """Non-GET request; clears the GET cache unless ``mutates`` is False"""
+    try:
+        return request(method, endpoint, token, data)
+    finally:
+        if mutates:
+            invalidate()
+
+
+def invalidate():
+    """Drop every cached GET response"""
+    _cached_get.clear()
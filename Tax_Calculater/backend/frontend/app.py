@@ -9,48 +9,109 @@ import plotly.graph_objects as go
 from datetime import datetime
 import json
 import os
+from urllib.parse import urlencode
+
+import api_client
 # Ensure the API base URL is set correctly
+EMPLOYEE_SORT_OPTIONS = {
+    "Employee ID": "employee_id",
+    "Full Name": "full_name",
+    "Salary": "salary",
+    "Experience": "years_of_experience",
+    "Created At": "created_at",
+}
+
+EMPLOYEE_COLUMN_LABELS = {
+    "employee_id": "Employee ID",
+    "full_name": "Full Name",
+    "tax_number": "Tax Number",
+    "years_of_experience": "Experience",
+    "skills": "Skills",
+    "salary": "Salary",
+    "calculated_tax": "Tax",
+    "tax_rate": "Tax Rate",
+    "created_at": "Created At",
+}
+
+def fetch_employee_page(query, cursor=None):
+    """One columnar page of /employees/records as a DataFrame, plus the next cursor"""
+    params = dict(query, format="columnar")
+    if cursor:
+        params["cursor"] = cursor
+    response = make_authenticated_request(f"/employees/records?{urlencode(params)}")
+    if not response or response.status_code != 200:
+        return None, None
+    payload = response.json()
+    df = pd.DataFrame(payload["columns"])
+    return df[list(EMPLOYEE_COLUMN_LABELS)].rename(columns=EMPLOYEE_COLUMN_LABELS), payload["next_cursor"]
+
 def all_employees_page():
-    """Show all employee records and their tax info in a table/grid."""
+    """Show employee records and their tax info, filtered and sorted by the API one page at a time."""
     st.header("👥 All Employee Records")
-    if st.button("Refresh Employee List") or 'employee_table_loaded' not in st.session_state:
+
+    with st.expander("Filter & Sort", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            name = st.text_input("Name contains")
+            min_salary = st.number_input("Min Salary (₹)", min_value=0.0, step=10000.0)
+            sort_label = st.selectbox("Sort by", list(EMPLOYEE_SORT_OPTIONS))
+        with col2:
+            skill = st.text_input("Skill contains")
+            max_salary = st.number_input("Max Salary (₹, 0 = no limit)", min_value=0.0, step=10000.0)
+            descending = st.checkbox("Descending")
+        page_size = st.select_slider("Rows per page", options=[50, 100, 250, 500, 1000], value=100)
+
+    query = {"limit": page_size, "sort": EMPLOYEE_SORT_OPTIONS[sort_label], "order": "desc" if descending else "asc"}
+    if name:
+        query["name"] = name
+    if skill:
+        query["skill"] = skill
+    if min_salary > 0:
+        query["min_salary"] = min_salary
+    if max_salary > 0:
+        query["max_salary"] = max_salary
+
+    # Start over whenever the filters change; otherwise keep the pages loaded so far
+    refresh = st.button("Refresh Employee List")
+    if refresh:
+        api_client.invalidate()
+    if refresh or st.session_state.get("employee_query") != query:
         try:
-            response = requests.get(f"{API_BASE_URL}/employees/records")
-            if response.status_code == 200:
-                data = response.json()
-                st.session_state.employee_table_loaded = True
-                if data:
-                    # Flatten for DataFrame
-                    rows = []
-                    for rec in data:
-                        emp = rec.get("employee", {})
-                        tax = rec.get("tax", {})
-                        rows.append({
-                            "Employee ID": emp.get("employee_id"),
-                            "Full Name": emp.get("full_name"),
-                            "Tax Number": emp.get("tax_number"),
-                            "Experience": emp.get("years_of_experience"),
-                            "Skills": emp.get("skills"),
-                            "Salary": emp.get("salary"),
-                            "Tax": tax.get("calculated_tax"),
-                            "Tax Rate": tax.get("tax_rate"),
-                            "Created At": emp.get("created_at")
-                        })
-                    df = pd.DataFrame(rows)
-                    st.dataframe(df, use_container_width=True)
-                else:
-                    st.info("No employee records found.")
-            else:
-                st.error(f"Failed to fetch employee records: {response.text}")
+            df, cursor = fetch_employee_page(query)
         except Exception as e:
             st.error(f"Error: {str(e)}")
+            return
+        if df is None:
+            st.error("Failed to fetch employee records")
+            return
+        st.session_state.employee_query = query
+        st.session_state.employee_pages = [df]
+        st.session_state.employee_cursor = cursor
+
+    pages = st.session_state.employee_pages
+    if not len(pages[0]):
+        st.info("No employee records found.")
+        return
+
+    st.dataframe(pd.concat(pages, ignore_index=True), use_container_width=True)
+    st.caption(f"Showing {sum(len(df) for df in pages):,} employees")
+
+    if st.session_state.employee_cursor and st.button("Load More"):
+        df, cursor = fetch_employee_page(query, st.session_state.employee_cursor)
+        if df is None:
+            st.error("Failed to fetch employee records")
+        else:
+            pages.append(df)
+            st.session_state.employee_cursor = cursor
+            st.rerun()
+
 def employee_dashboard_page():
     """Employee dashboard: show profile and tax info by employee ID"""
     st.header("📋 Employee Dashboard")
     employee_id = st.number_input("Enter Employee ID", min_value=1, step=1)
     if st.button("View Dashboard"):
         try:
-            response = requests.get(f"{API_BASE_URL}/employees/{int(employee_id)}/dashboard")
+            response = api_client.get(f"/employees/{int(employee_id)}/dashboard")
             if response.status_code == 200:
                 data = response.json()
                 emp = data.get("employee")
@@ -97,7 +158,7 @@ def employee_registration_page():
                     "salary": salary
                 }
                 try:
-                    response = requests.post(f"{API_BASE_URL}/employees/register", json=payload)
+                    response = api_client.send("POST", "/employees/register", data=payload)
                     if response.status_code == 200:
                         st.success("Employee registered and tax calculated!")
                         data = response.json()
@@ -107,8 +168,6 @@ def employee_registration_page():
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
 
-# Configuration
-API_BASE_URL = "http://localhost:8000"
 os.chdir("C:\\Users\\HP\\Desktop\\Tax Calculater")
 
 # Initialize session state
@@ -117,34 +176,40 @@ if "token" not in st.session_state:
 if "user_info" not in st.session_state:
     st.session_state.user_info = None
 
-def make_authenticated_request(endpoint, method="GET", data=None):
-    """Make authenticated API request"""
-    headers = {}
-    if st.session_state.token:
-        headers["Authorization"] = f"Bearer {st.session_state.token}"
-    
-    url = f"{API_BASE_URL}{endpoint}"
-    
+def make_authenticated_request(endpoint, method="GET", data=None, mutates=True):
+    """Make authenticated API request (GETs are cached, other methods clear the cache)"""
     try:
         if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data)
-        elif method == "PUT":
-            response = requests.put(url, headers=headers, json=data)
-        elif method == "DELETE":
-            response = requests.delete(url, headers=headers)
-        
-        return response
+            return api_client.get(endpoint, st.session_state.token)
+        return api_client.send(method, endpoint, st.session_state.token, data, mutates=mutates)
     except requests.exceptions.RequestException as e:
         st.error(f"API request failed: {str(e)}")
         return None
 
+def fetch_all_pages(endpoint, page_size=500):
+    """Follow next_cursor on a paginated endpoint and return every item (None on failure)"""
+    items = []
+    cursor = None
+    separator = "&" if "?" in endpoint else "?"
+    while True:
+        url = f"{endpoint}{separator}limit={page_size}"
+        if cursor:
+            url += f"&cursor={cursor}"
+        response = make_authenticated_request(url)
+        if not response or response.status_code != 200:
+            return None
+        page = response.json()
+        items.extend(page["items"])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            return items
+
 def login_user(username, password):
     """Login user and store token"""
-    response = requests.post(
-        f"{API_BASE_URL}/auth/login",
-        json={"username": username, "password": password}
+    response = api_client.send(
+        "POST", "/auth/login",
+        data={"username": username, "password": password},
+        mutates=False
     )
     
     if response.status_code == 200:
@@ -160,9 +225,10 @@ def login_user(username, password):
 
 def register_user(username, email, password):
     """Register new user"""
-    response = requests.post(
-        f"{API_BASE_URL}/auth/register",
-        json={"username": username, "email": email, "password": password}
+    response = api_client.send(
+        "POST", "/auth/register",
+        data={"username": username, "email": email, "password": password},
+        mutates=False
     )
     return response.status_code == 200
 
@@ -170,6 +236,7 @@ def logout_user():
     """Logout user"""
     st.session_state.token = None
     st.session_state.user_info = None
+    api_client.invalidate()
 
 def display_tax_breakdown(gross_salary, tax_data):
     """Display tax breakdown with visualizations"""
@@ -305,9 +372,8 @@ def quick_calculator_page():
     if st.button("Calculate Tax"):
         if gross_salary > 0:
             try:
-                response = requests.post(
-                    f"{API_BASE_URL}/tax/calculate",
-                    json={"gross_salary": gross_salary, "tax_year": datetime.now().year}
+                response = api_client.get(
+                    f"/tax/calculate?gross_salary={gross_salary}&tax_year={datetime.now().year}"
                 )
                 if response.status_code == 200:
                     tax_data = response.json()
@@ -357,7 +423,8 @@ def calculate_tax_page():
                     response = make_authenticated_request(
                         "/tax/calculate",
                         method="POST",
-                        data={"gross_salary": gross_salary, "tax_year": tax_year}
+                        data={"gross_salary": gross_salary, "tax_year": tax_year},
+                        mutates=False
                     )
                     if response and response.status_code == 200:
                         tax_data = response.json()
@@ -394,28 +461,31 @@ def tax_records_page():
     st.header("📊 My Tax Records")
     
     # Get tax records
-    response = make_authenticated_request("/tax/records")
-    if response and response.status_code == 200:
-        records = response.json()
+    records = fetch_all_pages("/tax/records")
+    if records is not None:
         
         if records:
             # Display records in a table
             df = pd.DataFrame(records)
             df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
             
-            # Display summary metrics
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Records", len(records))
-            with col2:
-                total_gross = sum(r['gross_salary'] for r in records)
-                st.metric("Total Gross Salary", f"₹{total_gross:,.2f}")
-            with col3:
-                total_tax = sum(r['tax_paid'] for r in records)
-                st.metric("Total Tax Paid", f"₹{total_tax:,.2f}")
-            with col4:
-                avg_tax_rate = (total_tax / total_gross * 100) if total_gross > 0 else 0
-                st.metric("Average Tax Rate", f"{avg_tax_rate:.2f}%")
+            # Display summary metrics (aggregated by the backend)
+            summary_response = make_authenticated_request("/tax/records/summary")
+            if summary_response and summary_response.status_code == 200:
+                summary = summary_response.json()
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Total Records", summary['record_count'])
+                with col2:
+                    st.metric("Total Gross Salary", f"₹{summary['total_gross_salary']:,.2f}")
+                with col3:
+                    st.metric("Total Tax Paid", f"₹{summary['total_tax_paid']:,.2f}")
+                with col4:
+                    st.metric("Average Tax Rate", f"{summary['average_tax_rate']:.2f}%")
+                
+                if len(summary['by_year']) > 1:
+                    st.subheader("Totals by Tax Year")
+                    st.dataframe(pd.DataFrame(summary['by_year']), use_container_width=True)
             
             st.subheader("Records Table")
             st.dataframe(
@@ -471,10 +541,12 @@ def tax_records_page():
                         min_value=0.0,
                         step=1000.0
                     )
+                    # Older records keep their own year selectable
+                    year_options = list(range(min(2020, record_to_edit['tax_year']), datetime.now().year + 2))
                     new_tax_year = st.selectbox(
                         "Tax Year:",
-                        options=list(range(2020, datetime.now().year + 2)),
-                        index=list(range(2020, datetime.now().year + 2)).index(record_to_edit['tax_year'])
+                        options=year_options,
+                        index=year_options.index(record_to_edit['tax_year'])
                     )
                     
                     col1, col2 = st.columns(2)
@@ -517,14 +589,13 @@ def profile_page():
         
         with col2:
             st.subheader("Account Statistics")
-            # Get tax records count
-            response = make_authenticated_request("/tax/records")
+            # Totals come pre-aggregated, so this does not depend on the record count
+            response = make_authenticated_request("/tax/records/summary")
             if response and response.status_code == 200:
-                records = response.json()
-                st.metric("Total Tax Records", len(records))
-                if records:
-                    total_tax_paid = sum(r['tax_paid'] for r in records)
-                    st.metric("Total Tax Calculated", f"₹{total_tax_paid:,.2f}")
+                summary = response.json()
+                st.metric("Total Tax Records", summary['record_count'])
+                if summary['record_count']:
+                    st.metric("Total Tax Calculated", f"₹{summary['total_tax_paid']:,.2f}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
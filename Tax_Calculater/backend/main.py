@@ -1,24 +1,56 @@
 # backend/main.py
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta, datetime
-from typing import List
-import traceback
-
-from . import crud, models, schemas, auth
-from .database import engine, get_db
-
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+from contextlib import asynccontextmanager
+from typing import List, Optional, Union
+import csv
+import hashlib
+import io
+import logging
+import os
+
+from . import analytics, async_crud, crud, models, schemas, auth, export, recompute, tax_engine
+from . import metrics, migrations
+from .cache import all_cache_stats
+from .database import close_engines, get_async_db, pool_statistics
+from .passwords import PasswordServiceBusy
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, paginate
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema work happens here, not at import, so importing the app stays cheap
+    if migrations.AUTO_MIGRATE:
+        applied = migrations.migrate()
+        if applied:
+            logger.info("Applied migrations: %s", ", ".join(applied))
+    else:
+        waiting = migrations.pending()
+        if waiting:
+            logger.warning("Pending migrations (run python -m backend.migrations): %s", ", ".join(waiting))
+    yield
+    auth.password_service.shutdown()
+    await close_engines()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Tax Calculator API",
     description="A production-grade tax calculator with user authentication",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=metrics.TimedJSONResponse,
+    lifespan=lifespan
 )
 
+# Latency / status / size metrics for every request, served at /metrics
+app.add_middleware(metrics.PrometheusMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +60,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(PasswordServiceBusy)
+async def password_service_busy_handler(request: Request, exc: PasswordServiceBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many concurrent logins, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 # =============================
 # 🌐 ROOT ENDPOINT
 # =============================
@@ -40,20 +80,21 @@ async def root():
 # =============================
 
 @app.post("/auth/register", response_model=schemas.UserResponse)
-async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_username(db, username=user.username)
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
 
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    return crud.create_user(db=db, user=user)
+    hashed_password = await auth.password_service.hash(user.password)
+    return await async_crud.create_user(db=db, user=user, hashed_password=hashed_password)
 
 @app.post("/auth/login", response_model=schemas.Token)
-async def login_user(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = auth.authenticate_user(db, user_credentials.username, user_credentials.password)
+async def login_user(user_credentials: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await auth.authenticate_user_async(db, user_credentials.username, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,26 +115,139 @@ async def read_users_me(current_user: models.User = Depends(auth.get_current_act
 # ✅ TAX CALCULATION ENDPOINT
 # =============================
 
-@app.post("/tax/calculate", response_model=schemas.TaxBreakdown)
-async def calculate_tax_endpoint(data: schemas.TaxRecordCreate):
+@app.get("/tax/rules")
+async def tax_rules():
+    return {
+        "version": tax_engine.registry.version,
+        "default_regime": tax_engine.DEFAULT_REGIME,
+        "regimes": tax_engine.registry.regimes()
+    }
+
+# Seconds browsers/proxies may reuse a /tax/calculate answer without asking.
+# A rules change alters every answer, so the default (0) makes clients
+# revalidate each time; the ETag keeps that a cheap 304.
+TAX_RESULT_MAX_AGE = int(os.getenv("TAX_RESULT_MAX_AGE", "0"))
+
+def _cache_control() -> str:
+    return f"public, max-age={TAX_RESULT_MAX_AGE}" if TAX_RESULT_MAX_AGE > 0 else "no-cache"
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check: a comma-separated list or "*", compared weakly (W/ ignored)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def _tax_breakdown(
+    request: Request,
+    response: Response,
+    gross_salary: float,
+    tax_year: int,
+    regime: Optional[str]
+):
+    """Shared body of the POST and GET calculate endpoints (cache + ETag)"""
     try:
-        gross_salary = data.gross_salary
         if gross_salary <= 0:
             raise HTTPException(status_code=400, detail="Gross salary must be positive")
 
-        result = crud.calculate_tax(gross_salary)
+        result = crud.calculate_tax(gross_salary, tax_year, regime)
+
+        etag_source = f"{tax_engine.registry.version}:{result['regime']}:{tax_year}:{gross_salary!r}"
+        etag = '"' + hashlib.sha1(etag_source.encode()).hexdigest()[:16] + '"'
+        cache_headers = {"ETag": etag, "Cache-Control": _cache_control()}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+        response.headers.update(cache_headers)
 
         return {
             "gross_salary": gross_salary,
             "tax_paid": result["tax_paid"],
             "net_salary": result["net_salary"],
             "tax_rate": result["tax_rate"],
-            "tax_brackets": result["tax_brackets"]
+            "tax_brackets": result["tax_brackets"],
+            "regime": result["regime"],
+            "tax_year": tax_year
         }
 
+    except tax_engine.UnknownTaxRuleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to calculate tax: {str(e)}")
 
+@app.post("/tax/calculate", response_model=schemas.TaxBreakdown)
+async def calculate_tax_endpoint(data: schemas.TaxCalculationRequest, request: Request, response: Response):
+    return _tax_breakdown(request, response, data.gross_salary, data.tax_year, data.regime)
+
+@app.get("/tax/calculate", response_model=schemas.TaxBreakdown)
+async def calculate_tax_get(
+    request: Request,
+    response: Response,
+    gross_salary: float,
+    tax_year: int = Query(default_factory=tax_engine.current_tax_year),
+    regime: Optional[str] = None
+):
+    return _tax_breakdown(request, response, gross_salary, tax_year, regime)
+
+# Upper bound on salaries in one batch calculation
+TAX_BATCH_MAX_ROWS = int(os.getenv("TAX_BATCH_MAX_ROWS", "100000"))
+# Larger batches are calculated on the threadpool instead of the event loop
+TAX_BATCH_INLINE_ROWS = int(os.getenv("TAX_BATCH_INLINE_ROWS", "2000"))
+
+def _tax_batch(gross_salaries: List[float], tax_years: List[int], regime: Optional[str]) -> dict:
+    """Validate and calculate one batch (CPU-bound; may run off the event loop)"""
+    invalid = [i for i, salary in enumerate(gross_salaries) if salary <= 0]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Gross salary must be positive", "indices": invalid[:100]}
+        )
+
+    try:
+        regime = regime or tax_engine.DEFAULT_REGIME
+        brackets = {year: tax_engine.get_schedule(regime, year).brackets for year in set(tax_years)}
+        result = crud.calculate_tax_many(gross_salaries, tax_years, regime)
+    except tax_engine.UnknownTaxRuleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "gross_salary": gross_salaries,
+        "tax_year": tax_years,
+        "tax_paid": result["tax_paid"].tolist(),
+        "net_salary": result["net_salary"].tolist(),
+        "tax_rate": result["tax_rate"].tolist(),
+        "regime": regime,
+        "tax_brackets": brackets
+    }
+
+@app.post("/tax/calculate/batch", response_model=schemas.TaxBatchResponse)
+async def calculate_tax_batch(data: schemas.TaxBatchRequest):
+    if data.items is not None:
+        gross_salaries = [item.gross_salary for item in data.items]
+        tax_years = [item.tax_year for item in data.items]
+    elif data.gross_salaries is not None:
+        gross_salaries = data.gross_salaries
+        tax_years = data.tax_years if data.tax_years is not None else []
+        if len(tax_years) != len(gross_salaries):
+            raise HTTPException(status_code=400, detail="gross_salaries and tax_years must have the same length")
+    else:
+        raise HTTPException(status_code=400, detail="Provide either items or gross_salaries/tax_years")
+
+    if len(gross_salaries) > TAX_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {TAX_BATCH_MAX_ROWS} salaries per batch")
+    if len(gross_salaries) > TAX_BATCH_INLINE_ROWS:
+        return await run_in_threadpool(_tax_batch, gross_salaries, tax_years, data.regime)
+    return _tax_batch(gross_salaries, tax_years, data.regime)
+
 # =============================
 # 📄 TAX RECORDS ENDPOINTS
 # =============================
@@ -102,33 +256,83 @@ async def calculate_tax_endpoint(data: schemas.TaxRecordCreate):
 async def create_tax_record(
     tax_record: schemas.TaxRecordCreate,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    print("Received request to create tax record")  # <-- Add this line
     try:
-        return crud.create_tax_record(db, tax_record, current_user.id)
-    except Exception as e:
-        print("Error saving tax record:", e)
-        traceback.print_exc()
-        db.rollback()
+        return await async_crud.create_tax_record(db, tax_record, current_user.id)
+    except tax_engine.UnknownTaxRuleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logger.exception("Error saving tax record")
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to save tax record")
 
-@app.get("/tax/records", response_model=List[schemas.TaxRecordResponse])
+def _binary_format(request: Request) -> Optional[str]:
+    """Arrow/Parquet format negotiated from the Accept header (406 if pyarrow is missing)"""
+    fmt = export.negotiate(request.headers.get("accept"))
+    if fmt:
+        export.require_pyarrow()
+    return fmt
+
+def _binary_response(statement, rows, fmt: str, next_cursor: Optional[str]) -> Response:
+    """One listing page as Arrow/Parquet; the next cursor travels in a header"""
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return Response(export.binary_page(statement, rows, fmt), media_type=export.MEDIA_TYPES[fmt], headers=headers)
+
+def _export_format(request: Request, format: Optional[str]) -> str:
+    """Explicit ?format= wins, then the Accept header, then NDJSON"""
+    if format in ("arrow", "parquet"):
+        export.require_pyarrow()
+        return format
+    return format or _binary_format(request) or "ndjson"
+
+@app.get("/tax/records", response_model=schemas.TaxRecordPage)
 async def get_tax_records(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    after = decode_cursor(cursor, datetime.fromisoformat, int) if cursor else None
+    binary = _binary_format(request)
+    if binary:
+        statement = crud.tax_record_export_statement(current_user.id, limit + 1, after)
+        rows = (await db.execute(statement)).all()
+        page, next_cursor = paginate(rows, limit, key=lambda r: (r.created_at, r.id))
+        return _binary_response(statement, page, binary, next_cursor)
+
+    records = await async_crud.get_tax_records(db, user_id=current_user.id, limit=limit + 1, after=after)
+    items, next_cursor = paginate(records, limit, key=lambda r: (r.created_at, r.id))
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/tax/records/summary", response_model=schemas.TaxRecordSummary)
+async def get_tax_record_summary(
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return crud.get_tax_records(db, user_id=current_user.id, skip=skip, limit=limit)
+    return await async_crud.get_tax_record_summary(db, current_user.id)
+
+@app.get("/tax/records/export")
+async def export_tax_records(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv|arrow|parquet)$"),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    format = _export_format(request, format)
+    return StreamingResponse(
+        export.stream_rows(crud.tax_record_export_statement(current_user.id), format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=tax_records.{format}"}
+    )
 
 @app.get("/tax/records/{record_id}", response_model=schemas.TaxRecordResponse)
 async def get_tax_record(
     record_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_record = crud.get_tax_record(db, record_id=record_id, user_id=current_user.id)
+    db_record = await async_crud.get_tax_record(db, record_id=record_id, user_id=current_user.id)
     if db_record is None:
         raise HTTPException(status_code=404, detail="Tax record not found")
     return db_record
@@ -138,11 +342,15 @@ async def update_tax_record(
     record_id: int,
     tax_record: schemas.TaxRecordUpdate,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_record = crud.update_tax_record(
-        db, record_id=record_id, user_id=current_user.id, tax_record=tax_record
-    )
+    try:
+        db_record = await async_crud.update_tax_record(
+            db, record_id=record_id, user_id=current_user.id, tax_record=tax_record
+        )
+    except tax_engine.UnknownTaxRuleError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     if db_record is None:
         raise HTTPException(status_code=404, detail="Tax record not found")
     return db_record
@@ -151,13 +359,93 @@ async def update_tax_record(
 async def delete_tax_record(
     record_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_record = crud.delete_tax_record(db, record_id=record_id, user_id=current_user.id)
+    db_record = await async_crud.delete_tax_record(db, record_id=record_id, user_id=current_user.id)
     if db_record is None:
         raise HTTPException(status_code=404, detail="Tax record not found")
     return {"message": "Tax record deleted successfully"}
 
+# =============================
+# 📈 PAYROLL ANALYTICS
+# =============================
+
+@app.get("/analytics/summary", response_model=schemas.PayrollTotals)
+async def payroll_summary(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(analytics.summary)
+
+@app.get("/analytics/brackets", response_model=List[schemas.PayrollBracketStats])
+async def payroll_by_bracket(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(analytics.bracket_stats)
+
+@app.get("/analytics/experience", response_model=List[schemas.PayrollExperienceStats])
+async def payroll_by_experience(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(analytics.experience_stats)
+
+@app.get("/analytics/tax-rate-percentiles")
+async def payroll_tax_rate_percentiles(
+    p: List[float] = Query([25, 50, 75, 90, 99]),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if any(not 0 < value <= 100 for value in p):
+        raise HTTPException(status_code=400, detail="Percentiles must be in (0, 100]")
+    return await db.run_sync(analytics.rate_percentiles, p)
+
+@app.post("/analytics/refresh")
+async def refresh_payroll_analytics(
+    current_user: models.User = Depends(auth.get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await db.run_sync(analytics.refresh)
+    return await db.run_sync(analytics.summary)
+
+# =============================
+# 🔁 RECOMPUTE STORED TAX ROWS
+# =============================
+
+@app.post("/tax/recompute", status_code=status.HTTP_202_ACCEPTED)
+async def start_recompute(
+    workers: int = Query(1, ge=1, le=32),
+    current_user: models.User = Depends(auth.get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Queued only: a `python -m backend.recompute --worker` process runs it
+    try:
+        job = await db.run_sync(recompute.create_job, workers)
+    except recompute.RecomputeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return await db.run_sync(recompute.job_progress, job.id)
+
+@app.get("/tax/recompute/{job_id}")
+async def recompute_progress(
+    job_id: int,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    progress = await db.run_sync(recompute.job_progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Recompute job not found")
+    return progress
+
+@app.post("/tax/recompute/{job_id}/resume", status_code=status.HTTP_202_ACCEPTED)
+async def resume_recompute(
+    job_id: int,
+    workers: Optional[int] = Query(None, ge=1, le=32),
+    current_user: models.User = Depends(auth.get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    progress = await db.run_sync(recompute.job_progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Recompute job not found")
+    if progress["rules_version"] != tax_engine.registry.version:
+        raise HTTPException(status_code=409, detail="Tax rules changed since this job started; start a new job")
+    # Refused while a job is live; a running job whose process died is queued again
+    try:
+        await db.run_sync(recompute.queue_job, job_id, workers)
+    except recompute.RecomputeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return await db.run_sync(recompute.job_progress, job_id)
+
 # =============================
 # 🩺 HEALTH CHECK ENDPOINT
 # =============================
@@ -165,6 +453,50 @@ async def delete_tax_record(
 async def health_check():
     return {"status": "healthy", "message": "Tax Calculator API is running"}
 
+@app.get("/stats/cache")
+async def cache_stats():
+    return {"caches": all_cache_stats()}
+
+@app.get("/stats/db-pool")
+async def db_pool_stats():
+    return pool_statistics()
+
+@metrics.register_collector
+def _stats_metrics():
+    """Cache, pool and password-executor statistics, read at scrape time"""
+    caches = all_cache_stats()
+    lines = []
+    for field, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("size", "gauge")):
+        lines += metrics.gauge_lines(
+            f"cache_{field}" + ("_total" if kind == "counter" else ""),
+            f"In-process cache {field}",
+            [({"cache": c["name"]}, c[field]) for c in caches],
+            kind
+        )
+    pools = pool_statistics()
+    for field, name, kind in (
+        ("checkouts", "db_pool_checkouts_total", "counter"),
+        ("waits", "db_pool_waits_total", "counter"),
+        ("wait_seconds_total", "db_pool_wait_seconds_total", "counter"),
+        ("checked_out", "db_pool_checked_out", "gauge"),
+        ("overflow", "db_pool_overflow", "gauge"),
+    ):
+        samples = [({"engine": engine_name}, pools[engine_name][field])
+                   for engine_name in ("sync", "async") if field in pools[engine_name]]
+        if samples:
+            lines += metrics.gauge_lines(name, f"Connection pool {field.replace('_', ' ')}", samples, kind)
+    password_stats = auth.password_service.stats()
+    lines += metrics.gauge_lines("password_hash_pending", "Hash/verify calls running or queued", [({}, password_stats["pending"])])
+    lines += metrics.gauge_lines(
+        "password_hash_rejected_total", "Hash/verify calls rejected because the queue was full",
+        [({}, password_stats["rejected"])], "counter"
+    )
+    return lines
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # =============================
 # � EMPLOYEE ENDPOINTS
 # =============================
@@ -174,44 +506,176 @@ from fastapi import Body
 @app.post("/employees/register", response_model=schemas.EmployeeResponse)
 async def register_employee(
     employee: schemas.EmployeeCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check for duplicate tax number
-    db_employee = crud.get_employee_by_tax_number(db, tax_number=employee.tax_number)
+    db_employee = await async_crud.get_employee_by_tax_number(db, tax_number=employee.tax_number)
     if db_employee:
         raise HTTPException(status_code=400, detail="Employee with this tax number already exists")
     # Create employee
-    db_employee = crud.create_employee(db, employee)
+    db_employee = await async_crud.create_employee(db, employee)
     # Calculate and store tax for employee
-    crud.create_employee_tax(db, db_employee.employee_id, db_employee.salary)
+    await async_crud.create_employee_tax(db, db_employee.employee_id, db_employee.salary)
     return db_employee
 
+# Upper bound on rows accepted by one bulk registration request
+BULK_MAX_ROWS = 100000
+
+async def _read_bulk_rows(request: Request) -> list:
+    """Read a bulk upload as a list of dicts (JSON array, text/csv body or multipart CSV file)"""
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Upload a CSV file in the 'file' field")
+            text = (await upload.read()).decode("utf-8-sig")
+            return list(csv.DictReader(io.StringIO(text)))
+        if content_type.startswith("text/csv"):
+            text = (await request.body()).decode("utf-8-sig")
+            return list(csv.DictReader(io.StringIO(text)))
+        rows = await request.json()
+    except (UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Could not parse the uploaded employees")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of employees")
+    return rows
+
+@app.post("/employees/register/bulk", response_model=schemas.EmployeeBulkResponse)
+async def register_employees_bulk(request: Request, db: AsyncSession = Depends(get_async_db)):
+    raw_rows = await _read_bulk_rows(request)
+    if len(raw_rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} employees per request")
+
+    # Validate every row up front so one bad row doesn't reject the upload
+    rows, errors = [], []
+    for index, raw in enumerate(raw_rows):
+        try:
+            rows.append((index, schemas.EmployeeCreate.model_validate(raw)))
+        except ValidationError as e:
+            tax_number = raw.get("tax_number") if isinstance(raw, dict) else None
+            errors.append({
+                "row": index,
+                # Echoed back as text whatever type the client sent
+                "tax_number": str(tax_number) if tax_number is not None else None,
+                "detail": "; ".join(f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors())
+            })
+
+    created = []
+    if rows:
+        try:
+            created, duplicate_errors = await async_crud.create_employees_bulk(db, rows)
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Tax numbers were registered concurrently, please retry")
+        errors.extend(duplicate_errors)
+
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "created_count": len(created),
+        "error_count": len(errors),
+        "created": created,
+        "errors": errors
+    }
+
 
 
 
 
 # --- All employees with tax info ---
-@app.get("/employees/records")
-async def all_employees_with_tax(db: Session = Depends(get_db)):
-    employees = db.query(models.Employee).all()
-    results = []
-    for emp in employees:
-        latest_tax = (
-            db.query(models.EmployeeTax)
-            .filter(models.EmployeeTax.employee_id == emp.employee_id)
-            .order_by(models.EmployeeTax.created_at.desc())
-            .first()
+# Converts a cursor's sort value back to the column type, per sort key
+EMPLOYEE_SORT_TYPES = {
+    "employee_id": int,
+    "full_name": str,
+    "salary": float,
+    "years_of_experience": int,
+    "created_at": datetime.fromisoformat,
+}
+
+@app.get(
+    "/employees/records",
+    response_model=Union[schemas.EmployeeWithTaxPage, schemas.EmployeeColumnarPage]
+)
+async def all_employees_with_tax(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    name: Optional[str] = None,
+    skill: Optional[str] = None,
+    min_salary: Optional[float] = None,
+    max_salary: Optional[float] = None,
+    min_experience: Optional[int] = None,
+    max_experience: Optional[int] = None,
+    sort: str = Query("employee_id", pattern="^(employee_id|full_name|salary|years_of_experience|created_at)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    format: str = Query("json", pattern="^(json|columnar)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    filters = schemas.EmployeeFilter(
+        name=name,
+        skill=skill,
+        min_salary=min_salary,
+        max_salary=max_salary,
+        min_experience=min_experience,
+        max_experience=max_experience
+    )
+    if not filters.dict(exclude_none=True):
+        filters = None
+    descending = order == "desc"
+
+    after = None
+    if cursor:
+        # The cursor records the sort it was issued for, so it cannot be replayed against another one
+        cursor_sort, cursor_order, value, employee_id = decode_cursor(
+            cursor, str, str, EMPLOYEE_SORT_TYPES[sort], int
+        )
+        if (cursor_sort, cursor_order) != (sort, order):
+            raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+        after = (value, employee_id)
+
+    binary = _binary_format(request)
+    if binary or format == "columnar":
+        statement = await async_crud.employee_export_statement(db, limit + 1, after, filters, sort, descending)
+        result = await db.execute(statement)
+        keys = list(result.keys())
+        page, next_cursor = paginate(
+            result.all(), limit, key=lambda row: (sort, order, getattr(row, sort), row.employee_id)
         )
-        results.append({
-            "employee": schemas.EmployeeResponse.from_orm(emp),
-            "tax": schemas.EmployeeTaxResponse.from_orm(latest_tax) if latest_tax else None
-        })
-    return results
+        if binary:
+            return _binary_response(statement, page, binary, next_cursor)
+        return {
+            "columns": {key: [row[i] for row in page] for i, key in enumerate(keys)},
+            "next_cursor": next_cursor
+        }
+
+    rows = await async_crud.get_employees_with_latest_tax(db, limit + 1, after, filters, sort, descending)
+    page, next_cursor = paginate(
+        rows, limit, key=lambda row: (sort, order, getattr(row[0], sort), row[0].employee_id)
+    )
+    return {
+        "items": [{"employee": emp, "tax": latest_tax} for emp, latest_tax in page],
+        "next_cursor": next_cursor
+    }
+
+# --- Streaming export of employees with latest tax ---
+@app.get("/employees/export")
+async def export_employees(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv|arrow|parquet)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    format = _export_format(request, format)
+    return StreamingResponse(
+        export.stream_rows(await async_crud.employee_export_statement(db), format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=employees.{format}"}
+    )
 
 # --- Employee dashboard endpoint (employee + tax info) ---
 @app.get("/employees/{employee_id}/dashboard")
-async def employee_dashboard(employee_id: int, db: Session = Depends(get_db)):
-    result = crud.get_employee_with_tax(db, employee_id)
+async def employee_dashboard(employee_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await async_crud.get_employee_with_tax(db, employee_id)
     if not result:
         raise HTTPException(status_code=404, detail="Employee not found")
     employee, tax = result
@@ -219,26 +683,33 @@ async def employee_dashboard(employee_id: int, db: Session = Depends(get_db)):
 
 # --- Get single employee (no tax info) ---
 @app.get("/employees/{employee_id}", response_model=schemas.EmployeeResponse)
-async def get_employee(employee_id: int, db: Session = Depends(get_db)):
-    result = crud.get_employee_with_tax(db, employee_id)
+async def get_employee(employee_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await async_crud.get_employee_with_tax(db, employee_id)
     if not result:
         raise HTTPException(status_code=404, detail="Employee not found")
     employee, _ = result
     return employee
 
-# --- List all employees (no tax info) ---
-@app.get("/employees", response_model=List[schemas.EmployeeResponse])
-async def list_employees(db: Session = Depends(get_db)):
-    employees = db.query(models.Employee).all()
-    return employees
+# --- List employees (no tax info) ---
+@app.get("/employees", response_model=schemas.EmployeePage)
+async def list_employees(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    after_id = decode_cursor(cursor, int)[0] if cursor else None
+    employees = await async_crud.get_employees(db, limit=limit + 1, after_id=after_id)
+    items, next_cursor = paginate(employees, limit, key=lambda emp: (emp.employee_id,))
+    return {"items": items, "next_cursor": next_cursor}
 
 # =============================
 # �🚀 LOCAL DEV ENTRY POINT
 # =============================
 
 # Only include this block for FastAPI backend, not Streamlit frontend
+# Development server with reload; use `python -m backend.server` in production
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
 
 # Remove Streamlit code from FastAPI backend
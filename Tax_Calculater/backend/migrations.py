@@ -0,0 +1,152 @@
+"""
+Schema migrations
+
+    python -m backend.migrations            # apply pending migrations
+    python -m backend.migrations --status   # list them; exits 1 if any are pending
+
+Each entry in MIGRATIONS runs once, in order, and is recorded in the
+schema_migrations table. The first one is create_all (checkfirst), so a
+database created by older versions (which ran create_all at import) is
+adopted as it is. Later schema changes get a new entry; applied entries are
+never edited.
+
+The API applies pending migrations at startup while AUTO_MIGRATE is on (the
+default). With many replicas, turn it off and run this module from the deploy
+step instead. On PostgreSQL an advisory lock makes concurrent runs wait for
+each other rather than race.
+"""
+import argparse
+import os
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+
+from . import models
+from .database import get_engine
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").strip().lower() in ("1", "true", "yes", "on")
+# pg_advisory_xact_lock key shared by every migrator
+MIGRATION_LOCK_ID = 7_340_021
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String(64), primary_key=True),
+    Column("description", String(200)),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def _create_tables(conn: Connection):
+    models.Base.metadata.create_all(conn)
+
+
+def _create_indexes(*indexes) -> Callable[[Connection], None]:
+    """
+    CREATE INDEX IF NOT EXISTS for model indexes that tables created earlier lack.
+
+    This locks writes to the table while it builds; on a large live PostgreSQL
+    table, create the index CONCURRENTLY by hand first and this becomes a no-op.
+    """
+    def upgrade(conn: Connection):
+        for index in indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+    return upgrade
+
+
+def _index(model, name: str):
+    return next(index for index in model.__table__.indexes if index.name == name)
+
+
+def _add_column(model, name: str) -> Callable[[Connection], None]:
+    """ALTER TABLE ADD COLUMN for a model column that tables created earlier lack"""
+    def upgrade(conn: Connection):
+        table = model.__table__
+        if name in {c["name"] for c in inspect(conn).get_columns(table.name)}:
+            return
+        column = table.c[name]
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(conn.dialect)}"
+        if column.default is not None and column.default.is_scalar:
+            ddl += f" NOT NULL DEFAULT {column.default.arg!r}"
+        conn.execute(text(ddl))
+    return upgrade
+
+
+def _create_payroll_stats_state(conn: Connection):
+    table = models.PayrollStatsState.__table__
+    table.create(conn, checkfirst=True)
+    if conn.scalar(select(func.count()).select_from(table)) == 0:
+        # No schedule recorded: the next employee tax write rebuilds the aggregates
+        conn.execute(insert(table).values(id=1))
+
+
+MIGRATIONS: List[Tuple[str, str, Callable[[Connection], None]]] = [
+    ("0001", "Create model tables", _create_tables),
+    ("0002", "Indexes for per-user record lookups, latest employee tax and employee sorts", _create_indexes(
+        _index(models.TaxRecord, "ix_tax_records_user_id_created_at_id"),
+        _index(models.TaxRecord, "ix_tax_records_user_id_tax_year"),
+        _index(models.EmployeeTax, "ix_employee_taxes_employee_id_created_at"),
+        _index(models.Employee, "ix_employees_full_name_employee_id"),
+        _index(models.Employee, "ix_employees_salary_employee_id"),
+        _index(models.Employee, "ix_employees_years_of_experience_employee_id"),
+        _index(models.Employee, "ix_employees_created_at_employee_id"),
+    )),
+    ("0003", "Record the tax schedule the payroll aggregates were built against", _create_payroll_stats_state),
+    ("0004", "Count recompute rows skipped for lack of rules", _add_column(models.RecomputeShard, "rows_skipped")),
+]
+
+
+def applied_versions(conn: Connection) -> List[str]:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return []
+    return list(conn.scalars(select(schema_migrations.c.version).order_by(schema_migrations.c.version)))
+
+
+def pending(engine: Optional[Engine] = None) -> List[str]:
+    """Versions not yet applied to the database"""
+    with (engine or get_engine()).connect() as conn:
+        applied = set(applied_versions(conn))
+    return [version for version, _, _ in MIGRATIONS if version not in applied]
+
+
+def migrate(engine: Optional[Engine] = None) -> List[str]:
+    """Apply pending migrations in one transaction; returns the versions applied"""
+    applied = []
+    with (engine or get_engine()).begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+        elif conn.dialect.name == "sqlite":
+            # pysqlite runs DDL outside a transaction (each CREATE commits and
+            # syncs on its own); an explicit BEGIN makes the run atomic and fast
+            conn.exec_driver_sql("BEGIN")
+        schema_migrations.create(conn, checkfirst=True)
+        done = set(applied_versions(conn))
+        for version, description, upgrade in MIGRATIONS:
+            if version in done:
+                continue
+            upgrade(conn)
+            conn.execute(insert(schema_migrations).values(version=version, description=description))
+            applied.append(version)
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--status", action="store_true", help="show applied and pending migrations only")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        waiting = pending()
+        for version, description, _ in MIGRATIONS:
+            print(f"{version}  {'pending' if version in waiting else 'applied'}  {description}")
+        return 1 if waiting else 0
+
+    applied = migrate()
+    print(f"Applied {', '.join(applied)}" if applied else "Database is up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
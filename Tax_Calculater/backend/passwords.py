@@ -0,0 +1,94 @@
+"""
+Executor-backed password hashing so bcrypt never runs on the event loop
+"""
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from .metrics import PASSWORD_HASH_DURATION
+
+# "thread" is enough for the bcrypt backend (it releases the GIL);
+# "process" isolates the hashing CPU from the API worker completely.
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests allowed to wait for a worker before new ones are rejected
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+
+class PasswordServiceBusy(Exception):
+    """Raised when the hashing queue is full; the client should retry later"""
+
+
+class PasswordService:
+    """
+    Runs password hash/verify functions on a bounded executor.
+
+    At most ``workers`` hashes run concurrently and at most ``max_queue``
+    more wait for a slot; anything beyond that fails fast with
+    PasswordServiceBusy instead of piling up behind a login burst.
+    """
+
+    def __init__(
+        self,
+        verify_fn: Callable[[str, str], bool],
+        hash_fn: Callable[[str], str],
+        executor: str = PASSWORD_HASH_EXECUTOR,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+    ):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown password executor: {executor}")
+        self._verify_fn = verify_fn
+        self._hash_fn = hash_fn
+        self.executor_kind = executor
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordServiceBusy("Password hashing queue is full")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            with PASSWORD_HASH_DURATION.time(operation=operation):
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify password against hash off the event loop"""
+        return await self._run("verify", self._verify_fn, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """Hash password off the event loop"""
+        return await self._run("hash", self._hash_fn, password)
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        """Stop the executor (called on application shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
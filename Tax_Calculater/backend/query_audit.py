@@ -0,0 +1,234 @@
+"""
+Query plan audit for the crud lookups
+
+    python -m backend.query_audit                          # audit DATABASE_URL as it is
+    python -m backend.query_audit --seed-users 20000 --seed-employees 200000
+
+Every check calls a crud function with values sampled from the database,
+records the SQL it sends and then runs EXPLAIN on each statement. The run
+fails if any plan reads a whole large table (--min-rows or more):
+
+  - a sequential scan: "Seq Scan" on PostgreSQL, a bare "SCAN <table>" on SQLite
+  - a full index scan with no search condition that no LIMIT cuts short:
+    "Index [Only] Scan" without an Index Cond and with no Limit above it
+    (a Sort, Hash or Aggregate in between reads everything first), or
+    "SCAN <table> USING [COVERING] INDEX" in a statement without LIMIT or
+    whose query level sorts into a temp B-tree
+
+LIMIT is matched in the statement text, so a LIMIT in one subquery also
+excuses index scans in another; read --verbose plans when in doubt.
+
+Checks run inside a transaction that is rolled back, so the write paths
+(create/update/delete) can be audited too. Substring filters on name/skill
+scan by nature and are left out. async_crud issues the same statements.
+"""
+import argparse
+import json
+import re
+import sys
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import crud, migrations, models, schemas
+from .database import get_engine
+
+# Tables below this many rows are read whole by any sensible planner
+MIN_ROWS = 10000
+
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?( USING (?:COVERING )?INDEX \w+)?$")
+# Steps that read every input row before a LIMIT above them can stop anything
+_SQLITE_TEMP_SORT = re.compile(r"^USE TEMP B-TREE FOR (?:ORDER BY|GROUP BY|DISTINCT)$")
+_PG_BLOCKING_NODES = {"Sort", "Aggregate", "Hash", "Materialize", "WindowAgg", "SetOp"}
+_LIMIT = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+
+
+def _samples(db: Session) -> dict:
+    """Real keys to query with: the busiest user, one of their records, the newest employee"""
+    user_id = db.scalar(
+        select(models.TaxRecord.user_id).group_by(models.TaxRecord.user_id)
+        .order_by(func.count().desc()).limit(1)
+    )
+    if user_id is None:
+        user_id = db.scalar(select(func.max(models.User.id)))
+    user = db.get(models.User, user_id)
+    record = db.scalars(
+        select(models.TaxRecord).where(models.TaxRecord.user_id == user_id)
+        .order_by(models.TaxRecord.created_at, models.TaxRecord.id).limit(1)
+    ).first()
+    employee = db.scalars(select(models.Employee).order_by(models.Employee.employee_id.desc()).limit(1)).first()
+    if user is None or record is None or employee is None:
+        raise SystemExit("Nothing to audit: seed the database first (--seed-users/--seed-employees)")
+    return {"user": user, "record": record, "employee": employee}
+
+
+def _employee_pages(db: Session, s: dict):
+    employee = s["employee"]
+    for sort, column in crud.EMPLOYEE_SORT_COLUMNS.items():
+        value = getattr(employee, column.key)
+        crud.get_employees_with_latest_tax(db, 50, None, None, sort, True)
+        crud.get_employees_with_latest_tax(db, 50, (value, employee.employee_id), None, sort, True)
+
+
+CHECKS: List[Tuple[str, Callable[[Session, dict], object]]] = [
+    ("get_user", lambda db, s: crud.get_user(db, s["user"].id)),
+    ("get_user_by_username", lambda db, s: crud.get_user_by_username(db, s["user"].username)),
+    ("get_user_by_email", lambda db, s: crud.get_user_by_email(db, s["user"].email)),
+    ("get_tax_records", lambda db, s: crud.get_tax_records(db, s["user"].id, 50)),
+    ("get_tax_records (next page)", lambda db, s: crud.get_tax_records(
+        db, s["user"].id, 50, (s["record"].created_at, s["record"].id))),
+    ("tax_record_export_statement", lambda db, s: db.execute(
+        crud.tax_record_export_statement(s["user"].id, 1000, (s["record"].created_at, s["record"].id))).all()),
+    ("get_tax_record_summary", lambda db, s: crud.get_tax_record_summary(db, s["user"].id)),
+    ("get_tax_record", lambda db, s: crud.get_tax_record(db, s["record"].id, s["user"].id)),
+    ("create_tax_record", lambda db, s: crud.create_tax_record(
+        db, schemas.TaxRecordCreate(gross_salary=900000, tax_year=s["record"].tax_year), s["user"].id)),
+    ("update_tax_record", lambda db, s: crud.update_tax_record(
+        db, s["record"].id, s["user"].id, schemas.TaxRecordUpdate(gross_salary=950000))),
+    ("delete_tax_record", lambda db, s: crud.delete_tax_record(db, s["record"].id, s["user"].id)),
+    ("get_employee_by_tax_number", lambda db, s: crud.get_employee_by_tax_number(db, s["employee"].tax_number)),
+    ("get_existing_tax_numbers", lambda db, s: crud.get_existing_tax_numbers(db, [s["employee"].tax_number, "NONE"])),
+    ("get_employee_with_tax", lambda db, s: crud.get_employee_with_tax(db, s["employee"].employee_id)),
+    ("get_employees", lambda db, s: crud.get_employees(db, 100, s["employee"].employee_id - 200)),
+    ("get_employees_with_latest_tax (sorted pages)", _employee_pages),
+    ("get_employees_with_latest_tax (salary range)", lambda db, s: crud.get_employees_with_latest_tax(
+        db, 50, None, schemas.EmployeeFilter(min_salary=s["employee"].salary, max_salary=s["employee"].salary),
+        "salary")),
+    ("employee_export_statement", lambda db, s: db.execute(
+        crud.employee_export_statement(db, 1000, (s["employee"].employee_id - 2000, s["employee"].employee_id - 2000))).all()),
+    ("create_employee_tax", lambda db, s: crud.create_employee_tax(db, s["employee"].employee_id, 1200000)),
+]
+
+
+def large_tables(conn: Connection, min_rows: int) -> Dict[str, int]:
+    counts = {
+        table.name: conn.scalar(select(func.count()).select_from(table))
+        for table in models.Base.metadata.sorted_tables
+    }
+    return {name: count for name, count in counts.items() if count >= min_rows}
+
+
+def _explain(conn: Connection, statement: str, parameters) -> Tuple[List[str], List[str]]:
+    """(plan lines, large-table names read by a full scan) for one statement"""
+    if conn.dialect.name == "postgresql":
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        lines, scanned = [], []
+
+        def walk(node, depth, limited):
+            relation = node.get("Relation Name")
+            node_type = node["Node Type"]
+            lines.append("  " * depth + node_type + (f" on {relation}" if relation else ""))
+            if node_type == "Seq Scan":
+                scanned.append(relation)
+            elif node_type in ("Index Scan", "Index Only Scan") and "Index Cond" not in node and not limited:
+                scanned.append(relation)
+            if node_type == "Limit":
+                limited = True
+            elif node_type in _PG_BLOCKING_NODES:
+                limited = False
+            for child in node.get("Plans", ()):
+                walk(child, depth + 1, limited)
+
+        walk(plan[0]["Plan"], 0, False)
+        return lines, scanned
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        lines = [row[3] for row in rows]
+        # Query levels (plan parents) that sort all their rows before any LIMIT applies
+        sorted_levels = {row[1] for row in rows if _SQLITE_TEMP_SORT.match(row[3])}
+        has_limit = bool(_LIMIT.search(statement))
+        scanned = []
+        for row in rows:
+            m = _SQLITE_FULL_SCAN.match(row[3])
+            if m and (not m.group(2) or not has_limit or row[1] in sorted_levels):
+                scanned.append(m.group(1))
+        return lines, scanned
+    raise SystemExit(f"EXPLAIN audit supports postgresql and sqlite, not {conn.dialect.name}")
+
+
+def audit(min_rows: int = MIN_ROWS, verbose: bool = False) -> List[str]:
+    """Run every check; returns a description of each offending statement"""
+    engine = get_engine()
+    if engine.dialect.name == "postgresql":
+        # Fresh statistics, as autovacuum would have them (committed, unlike the audit)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+    with engine.connect() as conn:
+        large = large_tables(conn, min_rows)
+    print(f"Large tables (>= {min_rows:,} rows): "
+          + (", ".join(f"{name} ({count:,})" for name, count in large.items()) or "none"))
+
+    failures = []
+    with engine.connect() as conn:
+        conn.begin()
+        if conn.dialect.name == "sqlite":
+            # SAVEPOINTs need a real transaction around them under pysqlite
+            conn.exec_driver_sql("BEGIN")
+        # crud commits become savepoint releases; the outer rollback undoes everything
+        db = Session(bind=conn, join_transaction_mode="create_savepoint")
+        captured: List[Tuple[str, object]] = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE", "WITH"):
+                captured.append((statement, parameters))
+
+        try:
+            samples = _samples(db)
+            for name, check in CHECKS:
+                captured.clear()
+                event.listen(conn, "before_cursor_execute", capture)
+                try:
+                    check(db, samples)
+                finally:
+                    event.remove(conn, "before_cursor_execute", capture)
+                statements = list(captured)
+                bad = []
+                for statement, parameters in statements:
+                    lines, scanned = _explain(conn, statement, parameters)
+                    offending = sorted(set(scanned) & set(large))
+                    if offending:
+                        bad.append(offending)
+                        failures.append(f"{name}: full scan of {', '.join(offending)}\n    "
+                                        + " ".join(statement.split()) + "\n      " + "\n      ".join(lines))
+                    elif verbose:
+                        print(f"  {name}: " + " | ".join(lines))
+                print(f"{'FAIL' if bad else 'ok':<6}{name} ({len(statements)} statements)")
+        finally:
+            db.close()
+            conn.rollback()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN every crud query and fail on full scans of large tables")
+    parser.add_argument("--min-rows", type=int, default=MIN_ROWS, help="tables with at least this many rows must not be scanned")
+    parser.add_argument("--seed-users", type=int, default=0, help="seed this many users (with tax records) first")
+    parser.add_argument("--seed-employees", type=int, default=0, help="seed this many employees first")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args(argv)
+
+    migrations.migrate()
+    if args.seed_users or args.seed_employees:
+        from . import seed
+
+        user_ids = seed.seed_users(args.seed_users)
+        seed.seed_tax_records(user_ids, 5)
+        seed.seed_employees(args.seed_employees, taxes_per_employee=2)
+
+    failures = audit(args.min_rows, args.verbose)
+    if failures:
+        print("\nFull scans on large tables:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nNo full scans on large tables")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
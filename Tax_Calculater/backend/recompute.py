@@ -0,0 +1,489 @@
+"""
+Recompute stored tax rows (TaxRecord, EmployeeTax) after the tax rules change
+
+A job splits each table's primary-key range into one shard per worker. Each
+shard walks its range in chunks: read the inputs, run the vectorized engine,
+write the results back in bulk, and advance its checkpoint (last_id) in the
+same transaction. A crashed or stopped job resumes from the checkpoints.
+Rows from a tax year the default regime has no rules for are left as they
+are and counted in rows_skipped, rather than failing the shard.
+
+Run from the command line:
+
+    python -m backend.recompute --worker      # run jobs queued through the API
+    python -m backend.recompute --workers 4   # create a job and run it now
+    python -m backend.recompute --resume 3
+
+The API only queues jobs (status "pending"); it never runs them, so a job
+outlives API worker restarts and holds no request threads. A long-running
+--worker process picks queued jobs up. Shards run in separate worker
+processes. On SQLite, writers serialize on the database lock, so use a
+single worker there.
+
+Only one job is queued or running at a time. The process running a job
+bumps its updated_at every RECOMPUTE_HEARTBEAT_SECONDS; a running job whose
+heartbeat is older than RECOMPUTE_STALE_SECONDS is taken to be dead (its
+process was killed). --worker takes such a job over, and so does a resume.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import Float, Integer, and_, column, func, not_, or_, select, text, update, values
+from sqlalchemy.orm import Session
+
+from . import analytics, models, tax_engine
+from .database import SessionLocal, dispose_engines
+
+RECOMPUTE_CHUNK_SIZE = 5000
+RECOMPUTE_HEARTBEAT_SECONDS = int(os.getenv("RECOMPUTE_HEARTBEAT_SECONDS", "30"))
+RECOMPUTE_STALE_SECONDS = int(os.getenv("RECOMPUTE_STALE_SECONDS", "120"))
+# How often an idle --worker looks for queued jobs
+RECOMPUTE_POLL_SECONDS = float(os.getenv("RECOMPUTE_POLL_SECONDS", "5"))
+# pg_advisory_xact_lock key serializing job creation and claims
+RECOMPUTE_LOCK_ID = 7_340_022
+
+# Tables the job rewrites, by name (as stored on shards)
+TARGETS = {
+    "tax_records": models.TaxRecord,
+    "employee_taxes": models.EmployeeTax,
+}
+
+
+class RecomputeError(Exception):
+    """The job cannot be started or resumed"""
+
+
+def _lock(db: Session):
+    """Serialize job creation and claims across processes (PostgreSQL; SQLite writers serialize anyway)"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": RECOMPUTE_LOCK_ID})
+
+
+def _stale():
+    """Filter for running jobs whose process stopped sending heartbeats"""
+    return and_(
+        models.RecomputeJob.status == "running",
+        or_(
+            models.RecomputeJob.updated_at.is_(None),
+            models.RecomputeJob.updated_at < datetime.utcnow() - timedelta(seconds=RECOMPUTE_STALE_SECONDS),
+        ),
+    )
+
+
+def _active():
+    """Filter for queued jobs and running jobs with a live heartbeat"""
+    return or_(
+        models.RecomputeJob.status == "pending",
+        and_(models.RecomputeJob.status == "running", not_(_stale())),
+    )
+
+
+def active_job(db: Session, exclude_id: Optional[int] = None) -> Optional[models.RecomputeJob]:
+    """The queued or live running job, if any"""
+    query = select(models.RecomputeJob).where(_active())
+    if exclude_id is not None:
+        query = query.where(models.RecomputeJob.id != exclude_id)
+    return db.scalars(query.order_by(models.RecomputeJob.id.desc()).limit(1)).first()
+
+
+def _refuse_if_active(db: Session, exclude_id: Optional[int] = None):
+    other = active_job(db, exclude_id)
+    if other is not None:
+        db.rollback()
+        raise RecomputeError(f"Recompute job {other.id} is already {other.status}")
+
+
+def _check_rules(job: Optional[models.RecomputeJob], job_id: int):
+    if job is None:
+        raise RecomputeError(f"Recompute job {job_id} not found")
+    if job.rules_version != tax_engine.registry.version:
+        raise RecomputeError(
+            f"Job {job_id} was started for rules {job.rules_version}; "
+            f"current rules are {tax_engine.registry.version}, start a new job"
+        )
+
+
+def create_job(db: Session, workers: int = 1, status: str = "pending") -> models.RecomputeJob:
+    """
+    Create a job with ``workers`` primary-key range shards per table.
+
+    "pending" queues it for a --worker; "running" is for a caller that runs
+    it straight away.
+    """
+    workers = max(1, workers)
+    _lock(db)
+    _refuse_if_active(db)
+    job = models.RecomputeJob(rules_version=tax_engine.registry.version, workers=workers, status=status)
+    db.add(job)
+    db.flush()
+
+    for table_name, model in TARGETS.items():
+        low, high = db.execute(select(func.min(model.id), func.max(model.id))).one()
+        if low is None:
+            continue
+        span = (high - low) // workers + 1
+        for start in range(low, high + 1, span):
+            end = min(start + span - 1, high)
+            rows_total = db.scalar(select(func.count()).where(model.id.between(start, end)))
+            db.add(models.RecomputeShard(
+                job_id=job.id,
+                table_name=table_name,
+                start_id=start,
+                end_id=end,
+                last_id=start - 1,
+                rows_total=rows_total,
+                rows_done=0,
+                status="pending",
+            ))
+
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _bulk_update(db: Session, model, rows: List[dict], fields: List[str]):
+    """
+    Write recomputed values back by primary key.
+
+    Postgres gets a single UPDATE ... FROM (VALUES ...); other databases
+    use an executemany UPDATE by primary key.
+    """
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        data = values(
+            column("id", Integer), *(column(field, Float) for field in fields), name="v"
+        ).data([tuple(row[key] for key in ["id"] + fields) for row in rows])
+        db.execute(
+            update(model.__table__)
+            .values({field: data.c[field] for field in fields})
+            .where(model.__table__.c.id == data.c.id)
+        )
+    else:
+        db.execute(update(model), rows)
+
+
+def _ruled(years) -> np.ndarray:
+    """Mask of the rows whose tax year the default regime has rules for"""
+    years = np.asarray(years, dtype=np.int64)
+    known = []
+    for year in np.unique(years).tolist():
+        try:
+            tax_engine.get_schedule(None, year)
+            known.append(year)
+        except tax_engine.UnknownTaxRuleError:
+            pass
+    return np.isin(years, known)
+
+
+def _recompute_tax_records(db: Session, shard: models.RecomputeShard, chunk_size: int) -> int:
+    rows = db.execute(
+        select(models.TaxRecord.id, models.TaxRecord.gross_salary, models.TaxRecord.tax_year)
+        .where(models.TaxRecord.id > shard.last_id, models.TaxRecord.id <= shard.end_id)
+        .order_by(models.TaxRecord.id)
+        .limit(chunk_size)
+    ).all()
+    if not rows:
+        return 0
+    ids, salaries, years = zip(*rows)
+    shard.last_id = ids[-1]
+    ruled = _ruled(years)
+    shard.rows_skipped += int((~ruled).sum())
+    ids, salaries, years = (np.asarray(values)[ruled] for values in (ids, salaries, years))
+    if len(ids) == 0:
+        return len(rows)
+    result = tax_engine.calculate_many(salaries, years)
+    _bulk_update(db, models.TaxRecord, [
+        {"id": record_id, "tax_paid": tax_paid, "net_salary": net_salary}
+        for record_id, tax_paid, net_salary in zip(ids.tolist(), result["tax_paid"].tolist(), result["net_salary"].tolist())
+    ], ["tax_paid", "net_salary"])
+    return len(rows)
+
+
+def _recompute_employee_taxes(db: Session, shard: models.RecomputeShard, chunk_size: int) -> int:
+    rows = db.execute(
+        select(models.EmployeeTax.id, models.Employee.salary, models.EmployeeTax.created_at)
+        .join(models.Employee, models.Employee.employee_id == models.EmployeeTax.employee_id)
+        .where(models.EmployeeTax.id > shard.last_id, models.EmployeeTax.id <= shard.end_id)
+        .order_by(models.EmployeeTax.id)
+        .limit(chunk_size)
+    ).all()
+    if not rows:
+        return 0
+    ids, salaries, created = zip(*rows)
+    # Employee taxes are computed for the tax year they were recorded in
+    years = [tax_engine.current_tax_year(ts) if ts else tax_engine.current_tax_year() for ts in created]
+    shard.last_id = ids[-1]
+    ruled = _ruled(years)
+    shard.rows_skipped += int((~ruled).sum())
+    ids, salaries, years = (np.asarray(values)[ruled] for values in (ids, salaries, years))
+    if len(ids) == 0:
+        return len(rows)
+    result = tax_engine.calculate_many(salaries, years)
+    _bulk_update(db, models.EmployeeTax, [
+        {"id": tax_id, "calculated_tax": tax_paid, "tax_rate": tax_rate}
+        for tax_id, tax_paid, tax_rate in zip(ids.tolist(), result["tax_paid"].tolist(), result["tax_rate"].tolist())
+    ], ["calculated_tax", "tax_rate"])
+    return len(rows)
+
+
+def run_shard(shard_id: int, chunk_size: int = RECOMPUTE_CHUNK_SIZE) -> int:
+    """Process one shard from its checkpoint to the end of its range"""
+    recompute_chunk = {
+        "tax_records": _recompute_tax_records,
+        "employee_taxes": _recompute_employee_taxes,
+    }
+    processed = 0
+    with SessionLocal() as db:
+        shard = db.get(models.RecomputeShard, shard_id)
+        shard.status = "running"
+        db.commit()
+        try:
+            while True:
+                count = recompute_chunk[shard.table_name](db, shard, chunk_size)
+                if count == 0:
+                    break
+                shard.rows_done += count
+                # Rows and checkpoint commit together, so a resume never redoes or skips a chunk
+                db.commit()
+                processed += count
+            shard.status = "completed"
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            shard.status = "failed"
+            shard.error = str(e)[:500]
+            db.commit()
+            raise
+    return processed
+
+
+def _transition(db: Session, job_id: int, status: str, *allowed, **values) -> bool:
+    """
+    Conditional status change, so two callers racing without the lock
+    (SQLite) cannot both win; commits on success
+    """
+    changed = db.execute(
+        update(models.RecomputeJob)
+        .where(models.RecomputeJob.id == job_id, or_(*allowed))
+        .values(status=status, updated_at=datetime.utcnow(), **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not changed:
+        db.rollback()
+        return False
+    db.commit()
+    return True
+
+
+def queue_job(db: Session, job_id: int, workers: Optional[int] = None) -> models.RecomputeJob:
+    """
+    Put a stopped job back in the queue for a --worker to resume, with
+    ``workers`` processes if given (the shards stay as they are).
+
+    Fails while any job is queued or running with a live heartbeat; a
+    running job whose process died is queued again.
+    """
+    job = db.get(models.RecomputeJob, job_id)
+    _check_rules(job, job_id)
+    _lock(db)
+    _refuse_if_active(db)
+    values = {"workers": workers} if workers else {}
+    if not _transition(db, job_id, "pending", models.RecomputeJob.status.in_(("completed", "failed")), _stale(), **values):
+        raise RecomputeError(f"Recompute job {job_id} is already queued or running")
+    db.refresh(job)
+    return job
+
+
+def claim_job(db: Session, job_id: int) -> models.RecomputeJob:
+    """
+    Mark a job running for this process before resuming it here.
+
+    A queued job is taken from the queue; fails while another job is queued
+    or running, or this one is running with a live heartbeat.
+    """
+    job = db.get(models.RecomputeJob, job_id)
+    _check_rules(job, job_id)
+    _lock(db)
+    _refuse_if_active(db, exclude_id=job_id)
+    if not _transition(db, job_id, "running", models.RecomputeJob.status != "running", _stale()):
+        raise RecomputeError(f"Recompute job {job_id} is already running")
+    db.refresh(job)
+    return job
+
+
+def next_job(db: Session) -> Optional[models.RecomputeJob]:
+    """Claim the oldest queued job, or a running one whose process died"""
+    _lock(db)
+    job = db.scalars(
+        select(models.RecomputeJob)
+        .where(or_(models.RecomputeJob.status == "pending", _stale()))
+        .order_by(models.RecomputeJob.id)
+        .limit(1)
+    ).first()
+    if job is None:
+        db.rollback()
+        return None
+    if not _transition(db, job.id, "running", models.RecomputeJob.status == "pending", _stale()):
+        return None
+    db.refresh(job)
+    return job
+
+
+def work(once: bool = False, chunk_size: int = RECOMPUTE_CHUNK_SIZE, poll_seconds: float = RECOMPUTE_POLL_SECONDS):
+    """Run queued jobs one after another; with once=True, stop when the queue is empty"""
+    while True:
+        with SessionLocal() as db:
+            job = next_job(db)
+            job_id = job.id if job is not None else None
+        if job_id is None:
+            if once:
+                return
+            time.sleep(poll_seconds)
+            continue
+        print(f"Running recompute job {job_id}", flush=True)
+        try:
+            job = run_job(job_id, None, chunk_size)
+            print(f"Job {job_id} {job.status}", flush=True)
+        except RecomputeError as e:
+            # Queued before the rules changed; it can never run
+            print(e, flush=True)
+            with SessionLocal() as db:
+                db.get(models.RecomputeJob, job_id).status = "failed"
+                db.commit()
+
+
+def _heartbeat(job_id: int):
+    with SessionLocal() as db:
+        db.execute(
+            update(models.RecomputeJob)
+            .where(models.RecomputeJob.id == job_id)
+            .values(updated_at=datetime.utcnow())
+        )
+        db.commit()
+
+
+def _init_worker():
+    # Connections inherited from the parent must not be shared after fork
+    dispose_engines(close=False)
+
+
+def run_job(job_id: int, workers: Optional[int] = None, chunk_size: int = RECOMPUTE_CHUNK_SIZE) -> models.RecomputeJob:
+    """
+    Run (or resume) every unfinished shard of a job across worker processes.
+
+    Callers mark the job running first (create_job, claim_job or next_job);
+    its heartbeat is kept fresh until the shards finish.
+    """
+    with SessionLocal() as db:
+        job = db.get(models.RecomputeJob, job_id)
+        if job is None:
+            raise RecomputeError(f"Recompute job {job_id} not found")
+        if job.rules_version != tax_engine.registry.version:
+            raise RecomputeError(
+                f"Job {job_id} was started for rules {job.rules_version}; "
+                f"current rules are {tax_engine.registry.version}, start a new job"
+            )
+        shard_ids = [shard.id for shard in job.shards if shard.status != "completed"]
+        workers = workers or job.workers
+        job.status = "running"
+        db.commit()
+
+    failed = False
+    if shard_ids:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shard_ids)), initializer=_init_worker) as pool:
+            running = {pool.submit(run_shard, shard_id, chunk_size) for shard_id in shard_ids}
+            while running:
+                done, running = wait(running, timeout=RECOMPUTE_HEARTBEAT_SECONDS, return_when=FIRST_COMPLETED)
+                if any(future.exception() is not None for future in done):
+                    failed = True
+                _heartbeat(job_id)
+
+    with SessionLocal() as db:
+        if not failed:
+            # Stored taxes changed underneath the incremental payroll aggregates
+            analytics.refresh(db)
+        job = db.get(models.RecomputeJob, job_id)
+        job.status = "failed" if failed else "completed"
+        db.commit()
+        db.refresh(job)
+        return job
+
+
+def job_progress(db: Session, job_id: int) -> Optional[dict]:
+    """Progress summary for the progress endpoint"""
+    job = db.get(models.RecomputeJob, job_id)
+    if job is None:
+        return None
+    rows_total = sum(shard.rows_total for shard in job.shards)
+    rows_done = sum(shard.rows_done for shard in job.shards)
+    rows_skipped = sum(shard.rows_skipped or 0 for shard in job.shards)
+    return {
+        "id": job.id,
+        "status": job.status,
+        "rules_version": job.rules_version,
+        "workers": job.workers,
+        "rows_total": rows_total,
+        "rows_done": rows_done,
+        "rows_skipped": rows_skipped,
+        "percent": round(rows_done / rows_total * 100, 2) if rows_total else 100.0,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "shards": [
+            {
+                "id": shard.id,
+                "table_name": shard.table_name,
+                "start_id": shard.start_id,
+                "end_id": shard.end_id,
+                "last_id": shard.last_id,
+                "rows_total": shard.rows_total,
+                "rows_done": shard.rows_done,
+                "rows_skipped": shard.rows_skipped,
+                "status": shard.status,
+                "error": shard.error,
+            }
+            for shard in job.shards
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute stored tax rows with the current tax rules")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (shards per table); default 1, or the job's own count with --resume")
+    parser.add_argument("--chunk-size", type=int, default=RECOMPUTE_CHUNK_SIZE)
+    parser.add_argument("--resume", type=int, metavar="JOB_ID", help="resume an existing job")
+    parser.add_argument("--worker", action="store_true", help="keep running jobs queued through the API")
+    parser.add_argument("--once", action="store_true", help="with --worker, stop when the queue is empty")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        work(args.once, args.chunk_size)
+        return 0
+
+    try:
+        with SessionLocal() as db:
+            if args.resume is not None:
+                job_id = claim_job(db, args.resume).id
+            else:
+                job_id = create_job(db, args.workers or 1, status="running").id
+                print(f"Created recompute job {job_id}")
+    except RecomputeError as e:
+        print(e)
+        return 1
+
+    job = run_job(job_id, args.workers, args.chunk_size)
+    with SessionLocal() as db:
+        progress = job_progress(db, job.id)
+    print(f"Job {job.id} {job.status}: {progress['rows_done']}/{progress['rows_total']} rows"
+          f" ({progress['rows_skipped']} without rules for their tax year, left as they were)")
+    return 0 if job.status == "completed" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
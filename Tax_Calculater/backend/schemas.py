@@ -3,7 +3,7 @@ Pydantic schemas for request/response validation
 """
 from pydantic import BaseModel, EmailStr, validator
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from fastapi import HTTPException
 import traceback
 
@@ -15,6 +15,8 @@ class TaxBreakdown(BaseModel):
     net_salary: float
     tax_rate: float
     tax_brackets: List[dict]
+    regime: Optional[str] = None
+    tax_year: Optional[int] = None
 
 # User schemas
 class UserBase(BaseModel):
@@ -53,6 +55,7 @@ class UserLogin(BaseModel):
 # Tax Record schemas
 class TaxRecordBase(BaseModel):
     gross_salary: float
+    # No range check: this shapes responses, and every stored year must stay readable
     tax_year: int
     
     @validator('gross_salary')
@@ -60,13 +63,6 @@ class TaxRecordBase(BaseModel):
         if v <= 0:
             raise ValueError('Gross salary must be positive')
         return v
-    
-    @validator('tax_year')
-    def validate_tax_year(cls, v):
-        current_year = datetime.now().year
-        if v < 2020 or v > current_year + 1:
-            raise ValueError(f'Tax year must be between 2020 and {current_year + 1}')
-        return v
 
 class TaxRecordCreate(BaseModel):
     gross_salary: float
@@ -76,6 +72,27 @@ class TaxRecordUpdate(BaseModel):
     gross_salary: Optional[float] = None
     tax_year: Optional[int] = None
 
+# Calculation-only request: the regime is not stored on tax records
+class TaxCalculationRequest(TaxRecordCreate):
+    regime: Optional[str] = None
+
+# Batch tax calculation: either a list of items or a columnar body
+class TaxBatchRequest(BaseModel):
+    items: Optional[List[TaxRecordCreate]] = None
+    gross_salaries: Optional[List[float]] = None
+    tax_years: Optional[List[int]] = None
+    regime: Optional[str] = None
+
+class TaxBatchResponse(BaseModel):
+    """Column-oriented results in request order; brackets are sent once per tax year"""
+    gross_salary: List[float]
+    tax_year: List[int]
+    tax_paid: List[float]
+    net_salary: List[float]
+    tax_rate: List[float]
+    regime: str
+    tax_brackets: Dict[int, List[dict]]
+
 class TaxRecordResponse(TaxRecordBase):
     id: int
     user_id: int
@@ -87,6 +104,26 @@ class TaxRecordResponse(TaxRecordBase):
     class Config:
         from_attributes = True
 
+class TaxRecordPage(BaseModel):
+    items: List[TaxRecordResponse]
+    next_cursor: Optional[str] = None
+
+class TaxYearSummary(BaseModel):
+    tax_year: int
+    record_count: int
+    total_gross_salary: float
+    total_tax_paid: float
+    total_net_salary: float
+    average_tax_rate: float
+
+class TaxRecordSummary(BaseModel):
+    record_count: int
+    total_gross_salary: float
+    total_tax_paid: float
+    total_net_salary: float
+    average_tax_rate: float
+    by_year: List[TaxYearSummary]
+
 
 # --- Employee schemas ---
 class EmployeeBase(BaseModel):
@@ -115,4 +152,66 @@ class EmployeeTaxResponse(EmployeeTaxBase):
     id: int
     class Config:
         from_attributes = True
-    
\ No newline at end of file
+
+
+# Bulk employee registration results (row = position in the upload, from 0)
+class EmployeeBulkCreated(BaseModel):
+    row: int
+    employee_id: int
+    tax_number: str
+
+class EmployeeBulkError(BaseModel):
+    row: int
+    tax_number: Optional[str] = None
+    detail: str
+
+class EmployeeBulkResponse(BaseModel):
+    created_count: int
+    error_count: int
+    created: List[EmployeeBulkCreated]
+    errors: List[EmployeeBulkError]
+
+# Server-side filters for employee listings (all optional, combined with AND)
+class EmployeeFilter(BaseModel):
+    name: Optional[str] = None
+    skill: Optional[str] = None
+    min_salary: Optional[float] = None
+    max_salary: Optional[float] = None
+    min_experience: Optional[int] = None
+    max_experience: Optional[int] = None
+
+class EmployeeWithTax(BaseModel):
+    employee: EmployeeResponse
+    tax: Optional[EmployeeTaxResponse] = None
+
+# Keyset-paginated employee listings
+class EmployeePage(BaseModel):
+    items: List[EmployeeResponse]
+    next_cursor: Optional[str] = None
+
+class EmployeeWithTaxPage(BaseModel):
+    items: List[EmployeeWithTax]
+    next_cursor: Optional[str] = None
+
+# Same page as column -> values lists (goes straight into a DataFrame)
+class EmployeeColumnarPage(BaseModel):
+    columns: Dict[str, List[Any]]
+    next_cursor: Optional[str] = None
+
+# --- Payroll analytics schemas ---
+class PayrollTotals(BaseModel):
+    employee_count: int
+    total_salary: float
+    total_tax: float
+    average_tax_rate: float
+
+class PayrollBracketStats(PayrollTotals):
+    bracket_index: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    rate: float
+
+class PayrollExperienceStats(PayrollTotals):
+    band: str
+    min_years: int
+    max_years: Optional[int] = None
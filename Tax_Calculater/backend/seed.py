@@ -0,0 +1,295 @@
+"""
+Bulk synthetic data for scale testing
+
+    python -m backend.seed --users 100000 --records-per-user 10 --employees 1000000
+
+Rows are generated in NumPy batches from a fixed seed (the same arguments
+always produce the same data) and written with COPY on Postgres and
+executemany batches elsewhere. Every seeded user shares one password, hashed
+once, so bcrypt never dominates the run. Primary keys are assigned here,
+continuing after the current maximum, so tax records and employee taxes can
+reference their parents without reading them back.
+
+Salaries are log-normal around --salary-median; records per user are fixed
+or Poisson distributed around --records-per-user.
+"""
+import argparse
+import csv
+import io
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Sequence
+
+import numpy as np
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Connection
+
+from . import analytics, migrations, models, tax_engine
+from .database import SessionLocal, get_engine
+
+SEED_PASSWORD = "seed-password"
+SEED_BATCH_SIZE = 10000
+# Seeded rows are spread over this window (fixed, so output is reproducible)
+SEED_START = datetime(2023, 4, 1)
+SEED_SPAN_DAYS = 730
+
+SKILLS = ["python,sql", "java,spring", "go,kubernetes", "accounting", "sales", "design", "data,ml", "support"]
+FIRST_NAMES = ["Aarav", "Diya", "Ishaan", "Kavya", "Rohan", "Ananya", "Vihaan", "Saanvi", "Arjun", "Meera"]
+LAST_NAMES = ["Sharma", "Iyer", "Reddy", "Patel", "Gupta", "Nair", "Singh", "Das", "Menon", "Kulkarni"]
+
+
+def _rng(seed: int, stream: int, batch: int) -> np.random.Generator:
+    """Independent, reproducible generator per (table, batch)"""
+    return np.random.default_rng([seed, stream, batch])
+
+
+def _salaries(rng: np.random.Generator, count: int, median: float, sigma: float) -> np.ndarray:
+    return np.round(rng.lognormal(np.log(median), sigma, count), -2)
+
+
+def _timestamps(rng: np.random.Generator, count: int) -> List[datetime]:
+    seconds = rng.integers(0, SEED_SPAN_DAYS * 86400, count)
+    return [SEED_START + timedelta(seconds=int(s)) for s in seconds]
+
+
+def _next_id(conn: Connection, column) -> int:
+    return (conn.scalar(select(func.max(column))) or 0) + 1
+
+
+def _copy_rows(conn: Connection, table, columns: Sequence[str], rows: Iterable[Sequence]) -> bool:
+    """COPY ... FROM STDIN through the raw driver connection; False if the driver can't"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow("" if v is None else v.isoformat() if isinstance(v, datetime) else v for v in row)
+    buffer.seek(0)
+    statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(statement, buffer)
+        elif hasattr(cursor, "copy"):  # psycopg 3
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            return False
+    finally:
+        cursor.close()
+    return True
+
+
+def _write(conn: Connection, model, columns: Sequence[str], rows: List[Sequence]):
+    table = model.__table__
+    if conn.dialect.name == "postgresql" and _copy_rows(conn, table, columns, rows):
+        return
+    conn.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+
+def _reset_sequence(conn: Connection, model, column: str):
+    """Move a Postgres serial past the ids assigned here"""
+    if conn.dialect.name == "postgresql":
+        table = model.__table__.name
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+            f"(SELECT COALESCE(MAX({column}), 1) FROM {table}))"
+        ))
+
+
+def _progress(label: str, done: int, total: int, started: float):
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed else 0
+    print(f"\r{label}: {done:,}/{total:,} rows ({rate:,.0f} rows/s)", end="", file=sys.stderr, flush=True)
+
+
+def seed_users(count: int, password: str = SEED_PASSWORD, seed: int = 0, batch_size: int = SEED_BATCH_SIZE) -> List[int]:
+    """Insert ``count`` users named seed_user_<id>; returns their ids"""
+    from .crud import get_password_hash  # crud must load before auth
+
+    # One bcrypt hash shared by every seeded user
+    hashed_password = get_password_hash(password)
+    columns = ["id", "username", "email", "hashed_password", "is_active", "created_at"]
+    started = time.perf_counter()
+    with get_engine().begin() as conn:
+        first_id = _next_id(conn, models.User.id)
+    for batch, start in enumerate(range(0, count, batch_size)):
+        size = min(batch_size, count - start)
+        created = _timestamps(_rng(seed, 1, batch), size)
+        rows = [
+            (user_id, f"seed_user_{user_id}", f"seed_user_{user_id}@example.com", hashed_password, True, created[i])
+            for i, user_id in enumerate(range(first_id + start, first_id + start + size))
+        ]
+        with get_engine().begin() as conn:
+            _write(conn, models.User, columns, rows)
+        _progress("users", start + size, count, started)
+    with get_engine().begin() as conn:
+        _reset_sequence(conn, models.User, "id")
+    if count:
+        print(file=sys.stderr)
+    return list(range(first_id, first_id + count))
+
+
+def seed_tax_records(
+    user_ids: Sequence[int],
+    records_per_user: float,
+    distribution: str = "poisson",
+    salary_median: float = 900000,
+    salary_sigma: float = 0.6,
+    first_year: int = 2020,
+    last_year: int = 2025,
+    seed: int = 0,
+    batch_size: int = SEED_BATCH_SIZE,
+) -> int:
+    """Insert tax records for ``user_ids``; returns the number of rows"""
+    columns = ["id", "user_id", "gross_salary", "tax_paid", "net_salary", "tax_year", "created_at", "updated_at"]
+    with get_engine().begin() as conn:
+        next_id = _next_id(conn, models.TaxRecord.id)
+
+    # Users are taken in groups so a batch holds about batch_size records
+    users_per_batch = max(int(batch_size / max(records_per_user, 1)), 1)
+    expected = int(len(user_ids) * records_per_user)
+    written = 0
+    started = time.perf_counter()
+    for batch, start in enumerate(range(0, len(user_ids), users_per_batch)):
+        rng = _rng(seed, 2, batch)
+        owners = np.asarray(user_ids[start:start + users_per_batch])
+        if distribution == "poisson":
+            counts = rng.poisson(records_per_user, len(owners))
+        else:
+            counts = np.full(len(owners), int(records_per_user))
+        owner_ids = np.repeat(owners, counts)
+        size = len(owner_ids)
+        if size == 0:
+            continue
+        salaries = _salaries(rng, size, salary_median, salary_sigma)
+        years = rng.integers(first_year, last_year + 1, size)
+        taxes = tax_engine.calculate_many(salaries, years)
+        created = _timestamps(rng, size)
+        rows = list(zip(
+            range(next_id, next_id + size),
+            owner_ids.tolist(),
+            salaries.tolist(),
+            taxes["tax_paid"].tolist(),
+            taxes["net_salary"].tolist(),
+            years.tolist(),
+            created,
+            created,
+        ))
+        with get_engine().begin() as conn:
+            _write(conn, models.TaxRecord, columns, rows)
+        next_id += size
+        written += size
+        _progress("tax records", written, max(expected, written), started)
+    with get_engine().begin() as conn:
+        _reset_sequence(conn, models.TaxRecord, "id")
+    if written:
+        print(file=sys.stderr)
+    return written
+
+
+def seed_employees(
+    count: int,
+    taxes_per_employee: int = 1,
+    salary_median: float = 900000,
+    salary_sigma: float = 0.6,
+    max_experience: int = 35,
+    seed: int = 0,
+    batch_size: int = SEED_BATCH_SIZE,
+) -> int:
+    """Insert employees and their tax history (the last row is the latest); returns employees written"""
+    employee_columns = ["employee_id", "full_name", "tax_number", "years_of_experience", "skills", "salary", "created_at"]
+    tax_columns = ["id", "employee_id", "calculated_tax", "tax_rate", "created_at"]
+    with get_engine().begin() as conn:
+        first_id = _next_id(conn, models.Employee.employee_id)
+        next_tax_id = _next_id(conn, models.EmployeeTax.id)
+
+    started = time.perf_counter()
+    for batch, start in enumerate(range(0, count, batch_size)):
+        rng = _rng(seed, 3, batch)
+        size = min(batch_size, count - start)
+        ids = np.arange(first_id + start, first_id + start + size)
+        salaries = _salaries(rng, size, salary_median, salary_sigma)
+        experience = rng.integers(0, max_experience + 1, size)
+        first_names = rng.integers(0, len(FIRST_NAMES), size)
+        last_names = rng.integers(0, len(LAST_NAMES), size)
+        skills = rng.integers(0, len(SKILLS), size)
+        created = _timestamps(rng, size)
+        employees = [
+            (
+                int(employee_id),
+                f"{FIRST_NAMES[first_names[i]]} {LAST_NAMES[last_names[i]]}",
+                f"SEED{employee_id:010d}",
+                int(experience[i]),
+                SKILLS[skills[i]],
+                float(salaries[i]),
+                created[i],
+            )
+            for i, employee_id in enumerate(ids)
+        ]
+
+        result = tax_engine.calculate_many(salaries)
+        tax_rows = []
+        for k in range(taxes_per_employee):
+            # Earlier history rows are a year apart, ending at registration
+            offset = timedelta(days=365 * (taxes_per_employee - 1 - k))
+            for i, employee_id in enumerate(ids):
+                tax_rows.append((
+                    next_tax_id,
+                    int(employee_id),
+                    float(result["tax_paid"][i]),
+                    float(result["tax_rate"][i]),
+                    created[i] - offset,
+                ))
+                next_tax_id += 1
+
+        with get_engine().begin() as conn:
+            _write(conn, models.Employee, employee_columns, employees)
+            _write(conn, models.EmployeeTax, tax_columns, tax_rows)
+        _progress("employees", start + size, count, started)
+    with get_engine().begin() as conn:
+        _reset_sequence(conn, models.Employee, "employee_id")
+        _reset_sequence(conn, models.EmployeeTax, "id")
+    if count:
+        print(file=sys.stderr)
+        # The payroll aggregates are maintained per write; rebuild them once here
+        with SessionLocal() as db:
+            analytics.refresh(db)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-insert synthetic users, tax records and employees")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--records-per-user", type=float, default=5, help="mean tax records per user")
+    parser.add_argument("--records-distribution", choices=["poisson", "fixed"], default="poisson")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--taxes-per-employee", type=int, default=1, help="employee_taxes rows per employee")
+    parser.add_argument("--salary-median", type=float, default=900000)
+    parser.add_argument("--salary-sigma", type=float, default=0.6, help="log-normal spread of salaries")
+    parser.add_argument("--max-experience", type=int, default=35)
+    parser.add_argument("--first-year", type=int, default=2020)
+    parser.add_argument("--last-year", type=int, default=2025)
+    parser.add_argument("--password", default=SEED_PASSWORD, help="password shared by every seeded user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    migrations.migrate()
+    started = time.perf_counter()
+    user_ids = seed_users(args.users, args.password, args.seed, args.batch_size)
+    seed_tax_records(
+        user_ids, args.records_per_user, args.records_distribution,
+        args.salary_median, args.salary_sigma, args.first_year, args.last_year,
+        args.seed, args.batch_size,
+    )
+    seed_employees(
+        args.employees, args.taxes_per_employee, args.salary_median, args.salary_sigma,
+        args.max_experience, args.seed, args.batch_size,
+    )
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+"""
+Production server entry point
+
+    python -m backend.server
+
+Runs WEB_CONCURRENCY worker processes (default: one per CPU). With gunicorn
+installed the app is imported once in the master (preload) and the workers
+fork from it. The compiled tax rules, the route table and every imported
+module are then shared copy-on-write instead of being rebuilt per worker.
+Without gunicorn it falls back to uvicorn's own process manager, which
+starts each worker from scratch.
+
+uvicorn picks uvloop and httptools automatically when they are installed
+(uvicorn[standard] pulls both in). On SIGTERM the workers stop accepting
+connections and finish in-flight requests for up to GRACEFUL_TIMEOUT seconds.
+"""
+import gc
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# "auto" uses gunicorn when it is installed, otherwise uvicorn
+SERVER_BACKEND = os.getenv("SERVER_BACKEND", "auto")
+# Seconds a worker gets to drain in-flight requests after SIGTERM
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Seconds a silent worker may hang before the master restarts it (gunicorn only)
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", "60"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+# Recycle a worker after this many requests (0 disables; gunicorn only)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+
+APP = "backend.main:app"
+
+
+def preload():
+    """Import the app and warm everything the workers only read"""
+    from .main import app
+    from . import auth, migrations, tax_engine
+    from .database import dispose_engines
+
+    # Migrate once here; each worker's startup then only finds nothing pending
+    if migrations.AUTO_MIGRATE:
+        migrations.migrate()
+        dispose_engines()
+
+    # Deferred imports the workers would otherwise each load on first use
+    auth.warm_up()
+
+    # Fill the schedule lookup cache for every regime and rule year
+    for regime, years in tax_engine.registry.regimes().items():
+        for year in years:
+            tax_engine.registry.get(regime, year)
+
+    # Objects that exist now are never freed, so keep the collector from
+    # touching (and un-sharing) their pages in the forked workers
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+    return app
+
+
+def post_fork(server, worker):
+    """Drop the pool connections inherited from the master; each worker opens its own"""
+    from .database import dispose_engines
+
+    dispose_engines(close=False)
+
+
+def run_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                "bind": f"{HOST}:{PORT}",
+                "workers": WEB_CONCURRENCY,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "preload_app": True,
+                "post_fork": post_fork,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "timeout": WORKER_TIMEOUT,
+                "keepalive": KEEPALIVE,
+                "max_requests": MAX_REQUESTS,
+                "max_requests_jitter": MAX_REQUESTS // 10,
+                "loglevel": LOG_LEVEL,
+                "accesslog": "-",
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return preload()
+
+    Server().run()
+
+
+def run_uvicorn():
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        loop="auto",
+        http="auto",
+        timeout_keep_alive=KEEPALIVE,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        log_level=LOG_LEVEL,
+    )
+
+
+def main():
+    backend = SERVER_BACKEND
+    if backend == "auto":
+        try:
+            import gunicorn  # noqa: F401
+            backend = "gunicorn"
+        except ImportError:
+            backend = "uvicorn"
+    if backend == "gunicorn":
+        run_gunicorn()
+    elif backend == "uvicorn":
+        if WEB_CONCURRENCY > 1:
+            logger.warning("gunicorn not used; %d uvicorn workers will each load the app", WEB_CONCURRENCY)
+        run_uvicorn()
+    else:
+        raise ValueError(f"Unknown SERVER_BACKEND: {SERVER_BACKEND}")
+
+
+if __name__ == "__main__":
+    main()
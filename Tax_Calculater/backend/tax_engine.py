@@ -0,0 +1,305 @@
+"""
+Compiled tax schedules - scalar (bisect) and vectorized (NumPy) evaluation
+
+Tax rules live in versioned JSON files under tax_rules/ (one file per regime
+and first tax year it applies to). They are compiled once at import into
+immutable TaxSchedule objects and looked up by (regime, tax_year).
+"""
+import hashlib
+import json
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class BracketSchedule:
+    """
+    Immutable progressive slab table, compiled once per rule file.
+
+    The cumulative tax owed at the start of every bracket is precomputed, so
+    a salary resolves with a single bisect over the bracket lower bounds:
+
+        tax = base[i] + (min(salary, upper[i]) - lower[i]) * rate[i]
+
+    where ``i`` is the last bracket whose lower bound is below the salary.
+    This matches the original per-bracket loop exactly, including the gaps
+    between a bracket's ``max`` and the next bracket's ``min``.
+    """
+
+    __slots__ = ("name", "brackets", "_lower", "_upper", "_rate", "_base",
+                 "_np_lower", "_np_upper", "_np_rate", "_np_base")
+
+    def __init__(self, name: str, brackets: Sequence[dict]):
+        ordered = sorted(brackets, key=lambda b: b["min"])
+        if not ordered:
+            raise ValueError("A bracket schedule needs at least one bracket")
+
+        lower, upper, rate, base = [], [], [], []
+        cumulative = 0.0
+        for bracket in ordered:
+            bracket_max = bracket["max"] if bracket["max"] is not None else float("inf")
+            lower.append(float(bracket["min"]))
+            upper.append(float(bracket_max))
+            rate.append(float(bracket["rate"]))
+            base.append(cumulative)
+            if bracket_max != float("inf"):
+                cumulative += (bracket_max - bracket["min"]) * bracket["rate"]
+
+        self.name = name
+        # Public, read-only view of the table (returned by the API as-is)
+        self.brackets: List[Dict[str, float]] = [
+            {"min": b["min"], "max": b["max"] if b["max"] is not None else float("inf"), "rate": b["rate"]}
+            for b in ordered
+        ]
+        self._lower = tuple(lower)
+        self._upper = tuple(upper)
+        self._rate = tuple(rate)
+        self._base = tuple(base)
+        self._np_lower = np.array(lower, dtype=np.float64)
+        self._np_upper = np.array(upper, dtype=np.float64)
+        self._np_rate = np.array(rate, dtype=np.float64)
+        self._np_base = np.array(base, dtype=np.float64)
+
+    def __repr__(self):
+        return f"BracketSchedule({self.name!r}, {len(self._lower)} brackets)"
+
+    def bracket_index(self, gross_salary: float) -> int:
+        """Index of the bracket a salary falls into (-1 if nothing is taxable)"""
+        return bisect_left(self._lower, gross_salary) - 1
+
+    def bracket_index_many(self, salaries) -> np.ndarray:
+        """Vectorized bracket_index()"""
+        return np.searchsorted(self._np_lower, np.asarray(salaries, dtype=np.float64), side="left") - 1
+
+    def tax_for(self, gross_salary: float) -> float:
+        """Unrounded tax owed on a single salary"""
+        i = bisect_left(self._lower, gross_salary) - 1
+        if i < 0:
+            return 0.0
+        return self._base[i] + (min(gross_salary, self._upper[i]) - self._lower[i]) * self._rate[i]
+
+    def calculate(self, gross_salary: float) -> dict:
+        """Calculate tax_paid, net_salary and tax_rate for one salary"""
+        total_tax = self.tax_for(gross_salary)
+        net_salary = gross_salary - total_tax
+        tax_rate = (total_tax / gross_salary * 100) if gross_salary > 0 else 0
+
+        return {
+            "tax_paid": round(total_tax, 2),
+            "net_salary": round(net_salary, 2),
+            "tax_rate": round(tax_rate, 2),
+        }
+
+    def calculate_many(self, salaries, rounded: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Vectorized calculate() over any array-like of salaries.
+
+        Returns a dict of float64 arrays (tax_paid, net_salary, tax_rate) in
+        the same order as the input, computed in one NumPy pass.
+        """
+        gross = np.asarray(salaries, dtype=np.float64)
+        idx = np.searchsorted(self._np_lower, gross, side="left") - 1
+        taxable = idx >= 0
+        safe_idx = np.where(taxable, idx, 0)
+
+        total_tax = self._np_base[safe_idx] + (
+            np.minimum(gross, self._np_upper[safe_idx]) - self._np_lower[safe_idx]
+        ) * self._np_rate[safe_idx]
+        total_tax = np.where(taxable, total_tax, 0.0)
+
+        net_salary = gross - total_tax
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tax_rate = np.where(gross > 0, total_tax / gross * 100, 0.0)
+
+        if not rounded:
+            return {"tax_paid": total_tax, "net_salary": net_salary, "tax_rate": tax_rate}
+        return {
+            "tax_paid": np.round(total_tax, 2),
+            "net_salary": np.round(net_salary, 2),
+            "tax_rate": np.round(tax_rate, 2),
+        }
+
+
+class UnknownTaxRuleError(ValueError):
+    """No compiled schedule exists for the requested regime / tax year"""
+
+
+class TaxSchedule:
+    """
+    Immutable, compiled tax rules from one rule file.
+
+    Tax is computed on income after the standard deduction: slab tax, less
+    the rebate when taxable income is within the rebate limit, plus the
+    surcharge tier for that income, plus cess on the total. Marginal relief
+    on the rebate and surcharge thresholds is not modelled.
+    """
+
+    __slots__ = ("regime", "effective_from", "version", "description", "slabs",
+                 "standard_deduction", "rebate_limit", "rebate_max",
+                 "_surcharge_above", "_surcharge_rate", "_np_surcharge_rate", "cess_rate")
+
+    def __init__(self, rule: dict):
+        self.regime = rule["regime"]
+        self.effective_from = int(rule["effective_from"])
+        self.version = str(rule.get("version", "1"))
+        self.description = rule.get("description", "")
+        self.slabs = BracketSchedule(f"{self.regime}_{self.effective_from}", rule["brackets"])
+        self.standard_deduction = float(rule.get("standard_deduction", 0))
+        rebate = rule.get("rebate") or {}
+        self.rebate_limit = float(rebate.get("income_limit", 0))
+        self.rebate_max = float(rebate.get("max_rebate", 0))
+        tiers = sorted(rule.get("surcharge") or [], key=lambda t: t["above"])
+        self._surcharge_above = tuple(float(t["above"]) for t in tiers)
+        # Index 0 is "below every tier"
+        self._surcharge_rate = (0.0,) + tuple(float(t["rate"]) for t in tiers)
+        self._np_surcharge_rate = np.array(self._surcharge_rate, dtype=np.float64)
+        self.cess_rate = float(rule.get("cess_rate", 0))
+
+    def __repr__(self):
+        return f"TaxSchedule({self.regime!r}, from {self.effective_from}, version={self.version!r})"
+
+    @property
+    def brackets(self) -> List[Dict[str, float]]:
+        return self.slabs.brackets
+
+    def bracket_index_many(self, salaries) -> np.ndarray:
+        """Slab index each salary's taxable income falls into (-1 if nothing is taxable)"""
+        taxable = np.maximum(np.asarray(salaries, dtype=np.float64) - self.standard_deduction, 0.0)
+        return self.slabs.bracket_index_many(taxable)
+
+    def tax_for(self, gross_salary: float) -> float:
+        """Unrounded total tax (including surcharge and cess) on a single salary"""
+        taxable = max(gross_salary - self.standard_deduction, 0.0)
+        tax = self.slabs.tax_for(taxable)
+        if taxable <= self.rebate_limit:
+            tax = max(tax - self.rebate_max, 0.0)
+        tax += tax * self._surcharge_rate[bisect_left(self._surcharge_above, taxable)]
+        return tax + tax * self.cess_rate
+
+    def calculate(self, gross_salary: float) -> dict:
+        """Calculate tax_paid, net_salary and tax_rate for one salary"""
+        total_tax = self.tax_for(gross_salary)
+        net_salary = gross_salary - total_tax
+        tax_rate = (total_tax / gross_salary * 100) if gross_salary > 0 else 0
+
+        return {
+            "tax_paid": round(total_tax, 2),
+            "net_salary": round(net_salary, 2),
+            "tax_rate": round(tax_rate, 2),
+        }
+
+    def calculate_many(self, salaries) -> Dict[str, np.ndarray]:
+        """Vectorized calculate() returning float64 arrays in input order"""
+        gross = np.asarray(salaries, dtype=np.float64)
+        taxable = np.maximum(gross - self.standard_deduction, 0.0)
+        tax = self.slabs.calculate_many(taxable, rounded=False)["tax_paid"]
+        tax = np.where(taxable <= self.rebate_limit, np.maximum(tax - self.rebate_max, 0.0), tax)
+        if self._surcharge_above:
+            tier = np.searchsorted(np.array(self._surcharge_above), taxable, side="left")
+            tax = tax + tax * self._np_surcharge_rate[tier]
+        total_tax = tax + tax * self.cess_rate
+
+        net_salary = gross - total_tax
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tax_rate = np.where(gross > 0, total_tax / gross * 100, 0.0)
+
+        return {
+            "tax_paid": np.round(total_tax, 2),
+            "net_salary": np.round(net_salary, 2),
+            "tax_rate": np.round(tax_rate, 2),
+        }
+
+
+class TaxRuleRegistry:
+    """
+    Rule files compiled into schedules, looked up by (regime, tax_year).
+
+    A rule applies from its ``effective_from`` tax year until the same
+    regime's next rule takes over. ``version`` is a digest of every rule
+    file, so anything derived from the rules can tell when they change.
+    """
+
+    def __init__(self, rules_dir: str):
+        self.rules_dir = rules_dir
+        digest = hashlib.sha256()
+        schedules: Dict[str, List[TaxSchedule]] = {}
+        for filename in sorted(os.listdir(rules_dir)):
+            if not filename.endswith(".json"):
+                continue
+            with open(os.path.join(rules_dir, filename), "rb") as f:
+                raw = f.read()
+            digest.update(filename.encode() + b"\0" + raw)
+            # Every rule is compiled here, once, so requests never parse anything
+            schedule = TaxSchedule(json.loads(raw))
+            schedules.setdefault(schedule.regime, []).append(schedule)
+        if not schedules:
+            raise ValueError(f"No tax rule files found in {rules_dir}")
+
+        self.version = digest.hexdigest()[:12]
+        self._schedules: Dict[str, Tuple[TaxSchedule, ...]] = {}
+        self._years: Dict[str, Tuple[int, ...]] = {}
+        for regime, compiled in schedules.items():
+            compiled.sort(key=lambda schedule: schedule.effective_from)
+            self._schedules[regime] = tuple(compiled)
+            self._years[regime] = tuple(schedule.effective_from for schedule in compiled)
+        self.get = lru_cache(maxsize=1024)(self._lookup)
+
+    def _lookup(self, regime: str, tax_year: int) -> TaxSchedule:
+        if regime not in self._schedules:
+            raise UnknownTaxRuleError(f"Unknown tax regime: {regime}")
+        i = bisect_right(self._years[regime], tax_year) - 1
+        if i < 0:
+            raise UnknownTaxRuleError(f"No {regime} regime rules for tax year {tax_year}")
+        return self._schedules[regime][i]
+
+    def regimes(self) -> Dict[str, List[int]]:
+        """Regime -> tax years in which a new rule takes effect"""
+        return {regime: list(years) for regime, years in self._years.items()}
+
+
+RULES_DIR = os.getenv("TAX_RULES_DIR", os.path.join(os.path.dirname(__file__), "tax_rules"))
+
+# The original slab table is kept as the "legacy" regime so stored records
+# and existing clients keep their numbers unless they opt into old/new.
+DEFAULT_REGIME = os.getenv("TAX_DEFAULT_REGIME", "legacy")
+
+registry = TaxRuleRegistry(RULES_DIR)
+
+
+def current_tax_year(today: Optional[date] = None) -> int:
+    """Tax year (financial year start) in effect today; the FY starts in April"""
+    today = today or date.today()
+    return today.year if today.month >= 4 else today.year - 1
+
+
+def get_schedule(regime: Optional[str] = None, tax_year: Optional[int] = None) -> TaxSchedule:
+    """Get the compiled schedule for a regime and tax year"""
+    return registry.get(regime or DEFAULT_REGIME, tax_year if tax_year is not None else current_tax_year())
+
+
+def calculate_many(gross_salaries, tax_years=None, regime: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Vectorized tax for salaries that may span several tax years.
+
+    Rows are grouped by year so each distinct schedule runs one NumPy pass.
+    """
+    gross = np.asarray(gross_salaries, dtype=np.float64)
+    if tax_years is None:
+        return get_schedule(regime).calculate_many(gross)
+
+    years = np.asarray(tax_years, dtype=np.int64)
+    distinct, inverse = np.unique(years, return_inverse=True)
+    if len(distinct) == 1:
+        return get_schedule(regime, int(distinct[0])).calculate_many(gross)
+
+    result = {key: np.empty_like(gross) for key in ("tax_paid", "net_salary", "tax_rate")}
+    for i, year in enumerate(distinct):
+        mask = inverse == i
+        partial = get_schedule(regime, int(year)).calculate_many(gross[mask])
+        for key, values in partial.items():
+            result[key][mask] = values
+    return result
@@ -0,0 +1,12 @@
+"""
+Benchmarks for the Tax Calculator API
+
+    python -m benchmarks micro                  # calculate_tax, JWT, schema serialization
+    python -m benchmarks load --users 50        # in-process load test of the FastAPI app
+    python -m benchmarks startup                # cold start: import, migrations, first response
+    python -m benchmarks all --compare          # all three, compared with benchmarks/baseline.json
+    python -m benchmarks all --save-baseline    # record a new baseline
+
+Run from the Tax_Calculater directory. Every run uses a fresh temporary
+SQLite database; DATABASE_URL is set before the backend is imported.
+"""
@@ -0,0 +1,86 @@
+"""
+Command-line entry point: python -m benchmarks {micro,load,startup,all}
+"""
+import argparse
+import json
+import sys
+
+from .harness import print_table, use_temporary_database
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Tax Calculator benchmarks")
+    parser.add_argument("suite", choices=["micro", "load", "startup", "all"])
+    parser.add_argument("--iterations", type=int, default=2000, help="microbenchmark iterations")
+    parser.add_argument("--startups", type=int, default=5, help="cold starts to time")
+    parser.add_argument("--startup-budget", type=float, metavar="MS",
+                        help="fail if the median launch-to-first-response exceeds MS "
+                             "(default with --compare: 1500)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--records-per-user", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000, help="total requests in the load test")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users")
+    parser.add_argument("--mix", default="default", help="operation mix (see benchmarks.load.MIXES)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH")
+    parser.add_argument("--compare", action="store_true", help="compare with the stored baseline")
+    parser.add_argument("--baseline", help="baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument("--tolerance", type=float, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    # Before any backend import
+    use_temporary_database()
+
+    from . import compare, load, micro, startup
+
+    results = {}
+    if args.suite in ("micro", "all"):
+        results["micro"] = micro.run(args.iterations)
+        print_table("Microbenchmarks", results["micro"])
+    if args.suite in ("load", "all"):
+        results["load"] = load.run(
+            users=args.users,
+            employees=args.employees,
+            records_per_user=args.records_per_user,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            mix=args.mix,
+            rng_seed=args.seed,
+        )
+        print_table(f"Load test ({args.mix} mix, {args.concurrency} virtual users)", results["load"])
+    if args.suite in ("startup", "all"):
+        results["startup"] = startup.run(args.startups)
+        print_table("Cold start", results["startup"])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    baseline_path = args.baseline or compare.BASELINE_PATH
+    if args.save_baseline:
+        compare.save_baseline(results, baseline_path)
+        print(f"\nBaseline written to {baseline_path}")
+        return 0
+    budget = args.startup_budget
+    if budget is None and args.compare:
+        budget = startup.DEFAULT_STARTUP_BUDGET_MS
+    over_budget = "startup" in results and budget is not None and startup.over_budget(results["startup"], budget)
+    if over_budget:
+        print(f"\nCold start over budget: p50 {results['startup']['process to first response']['p50_ms']:.0f} ms > {budget:.0f} ms")
+
+    if args.compare:
+        tolerance = args.tolerance if args.tolerance is not None else compare.DEFAULT_TOLERANCE
+        regressions = compare.compare(results, compare.load_baseline(baseline_path), tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
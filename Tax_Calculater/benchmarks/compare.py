@@ -0,0 +1,74 @@
+"""
+Baseline storage and regression checks
+"""
+import json
+import os
+import platform
+from typing import Dict, List
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Relative slowdown tolerated before a result counts as a regression; tail
+# latency is noisier than throughput and the median, so p99 gets twice this
+DEFAULT_TOLERANCE = 0.25
+# Latency increases smaller than these (milliseconds) are treated as noise:
+# the tail of a sub-millisecond operation is mostly event-loop scheduling
+P50_NOISE_FLOOR_MS = 0.05
+P99_NOISE_FLOOR_MS = 5.0
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def save_baseline(results: Dict[str, dict], path: str = BASELINE_PATH):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), **results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, dict]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Compare each suite/benchmark present in both runs.
+
+    A benchmark regresses when its throughput falls, or its p50 or p99
+    latency rises, by more than ``tolerance`` (twice that for p99, and in
+    both cases by more than the noise floor). Returns the regression descriptions
+    (empty when everything is within tolerance) and prints a delta table.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<44}{'ops/s':>12}{'base':>12}{'Δ':>8}{'p99 ms':>10}{'base':>10}{'Δ':>8}")
+    for suite, benchmarks in results.items():
+        for name, current in benchmarks.items():
+            previous = baseline.get(suite, {}).get(name)
+            if previous is None:
+                continue
+            label = f"{suite}: {name}"
+            throughput_delta = (
+                current["throughput_per_s"] / previous["throughput_per_s"] - 1 if previous["throughput_per_s"] else 0.0
+            )
+            p50_delta = current["p50_ms"] / previous["p50_ms"] - 1 if previous["p50_ms"] else 0.0
+            p99_delta = current["p99_ms"] / previous["p99_ms"] - 1 if previous["p99_ms"] else 0.0
+            print(
+                f"{label:<44}{current['throughput_per_s']:>12.1f}{previous['throughput_per_s']:>12.1f}"
+                f"{throughput_delta:>+8.0%}{current['p99_ms']:>10.3f}{previous['p99_ms']:>10.3f}{p99_delta:>+8.0%}"
+            )
+            if throughput_delta < -tolerance:
+                regressions.append(f"{label}: throughput {throughput_delta:+.0%}")
+            if p50_delta > tolerance and current["p50_ms"] - previous["p50_ms"] > P50_NOISE_FLOOR_MS:
+                regressions.append(f"{label}: p50 {p50_delta:+.0%}")
+            if p99_delta > 2 * tolerance and current["p99_ms"] - previous["p99_ms"] > P99_NOISE_FLOOR_MS:
+                regressions.append(f"{label}: p99 {p99_delta:+.0%}")
+            if current["errors"] > previous["errors"]:
+                regressions.append(f"{label}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
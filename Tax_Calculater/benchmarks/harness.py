@@ -0,0 +1,74 @@
+"""
+Shared setup and statistics for the benchmarks
+"""
+import gc
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List, Sequence
+
+
+def use_temporary_database() -> str:
+    """
+    Point DATABASE_URL at a new SQLite file.
+
+    Must run before the backend first touches the database: the engines
+    are created from DATABASE_URL on first use.
+    """
+    directory = tempfile.mkdtemp(prefix="taxcalc-bench-")
+    path = os.path.join(directory, "bench.db")
+    # WAL is persistent per file: readers stop blocking the writer under concurrency
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+    url = f"sqlite:///{path}"
+    os.environ["DATABASE_URL"] = url
+    return url
+
+
+def percentile(sorted_samples: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_samples) + 0.5)) - 1, 0)
+    return sorted_samples[min(rank, len(sorted_samples) - 1)]
+
+
+def summarize(samples: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    """Throughput and latency percentiles (milliseconds) for one operation"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "throughput_per_s": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+    }
+
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int = 10) -> Dict[str, float]:
+    """Time ``iterations`` calls of fn individually"""
+    for _ in range(warmup):
+        fn()
+    # Leftover garbage from setup would otherwise be collected inside the timed loop
+    gc.collect()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, time.perf_counter() - start)
+
+
+def print_table(title: str, results: Dict[str, Dict[str, float]]):
+    print(f"\n{title}")
+    print(f"{'benchmark':<34}{'count':>8}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<34}{r['count']:>8}{r['throughput_per_s']:>12.1f}"
+            f"{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['errors']:>8}"
+        )
@@ -0,0 +1,164 @@
+"""
+In-process load generator for the FastAPI app
+
+Requests go through httpx's ASGI transport straight into the app (no
+sockets), against a temporary SQLite database seeded with users,
+employees and tax records. Each virtual user draws operations from a
+weighted mix with its own seeded RNG, so a run is repeatable.
+"""
+import asyncio
+import random
+import time
+from datetime import timedelta
+from typing import Dict, List
+
+import httpx
+
+from .harness import summarize
+
+BENCH_PASSWORD = "bench-password"
+
+# Relative weights of each operation per mix
+MIXES = {
+    "default": {
+        "login": 2,
+        "calculate": 35,
+        "list_records": 25,
+        "list_employees": 13,
+        "create_record": 15,
+        "register": 10,
+    },
+    "read_heavy": {
+        "login": 1,
+        "calculate": 40,
+        "list_records": 35,
+        "list_employees": 24,
+    },
+    "write_heavy": {
+        "login": 2,
+        "calculate": 18,
+        "create_record": 40,
+        "register": 40,
+    },
+}
+
+
+def seed(users: int, employees: int, records_per_user: int, rng_seed: int = 42) -> List[str]:
+    """Fill the database; returns the usernames (all share BENCH_PASSWORD)"""
+    from backend import seed as seeding
+
+    user_ids = seeding.seed_users(users, BENCH_PASSWORD, rng_seed)
+    seeding.seed_tax_records(
+        user_ids, records_per_user, "fixed", first_year=2024, last_year=2024, seed=rng_seed
+    )
+    seeding.seed_employees(employees, seed=rng_seed)
+    return [f"seed_user_{user_id}" for user_id in user_ids]
+
+
+class VirtualUser:
+    """One client session: a token, an RNG, and the operations it can run"""
+
+    def __init__(self, client: httpx.AsyncClient, index: int, username: str, token: str, rng_seed: int):
+        self.client = client
+        self.index = index
+        self.username = username
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.rng = random.Random(rng_seed * 1_000_003 + index)
+        self.registered = 0
+
+    async def login(self):
+        return await self.client.post("/auth/login", json={"username": self.username, "password": BENCH_PASSWORD})
+
+    async def calculate(self):
+        salary = self.rng.randrange(100_000, 5_000_000, 500)
+        return await self.client.get(f"/tax/calculate?gross_salary={salary}&tax_year=2024")
+
+    async def list_records(self):
+        return await self.client.get("/tax/records?limit=50", headers=self.headers)
+
+    async def list_employees(self):
+        return await self.client.get("/employees/records?limit=100")
+
+    async def create_record(self):
+        salary = float(self.rng.randrange(200_000, 4_000_000, 1000))
+        return await self.client.post(
+            "/tax/records", json={"gross_salary": salary, "tax_year": 2024}, headers=self.headers
+        )
+
+    async def register(self):
+        self.registered += 1
+        return await self.client.post("/employees/register", json={
+            "full_name": f"Load {self.index}-{self.registered}",
+            "tax_number": f"LOAD{self.index:04d}{self.registered:07d}",
+            "years_of_experience": self.rng.randint(0, 35),
+            "skills": "python",
+            "salary": float(self.rng.randrange(200_000, 4_000_000, 1000)),
+        })
+
+
+async def _drive(app, usernames: List[str], total_requests: int, concurrency: int, mix: Dict[str, int], rng_seed: int):
+    from backend import auth
+
+    operations = list(mix)
+    weights = [mix[op] for op in operations]
+    samples: Dict[str, List[float]] = {op: [] for op in operations}
+    errors: Dict[str, int] = {op: 0 for op in operations}
+    remaining = total_requests
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        users = [
+            VirtualUser(
+                client, i, usernames[i % len(usernames)],
+                auth.create_access_token({"sub": usernames[i % len(usernames)]}, timedelta(hours=1)),
+                rng_seed,
+            )
+            for i in range(concurrency)
+        ]
+
+        async def worker(user: VirtualUser):
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                op = user.rng.choices(operations, weights)[0]
+                start = time.perf_counter()
+                try:
+                    response = await getattr(user, op)()
+                    failed = response.status_code >= 400
+                except Exception:
+                    failed = True
+                samples[op].append(time.perf_counter() - start)
+                if failed:
+                    errors[op] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(user) for user in users))
+        elapsed = time.perf_counter() - start
+
+    results = {op: summarize(samples[op], elapsed, errors[op]) for op in operations if samples[op]}
+    results["overall"] = summarize(
+        [s for op in operations for s in samples[op]], elapsed, sum(errors.values())
+    )
+    return results
+
+
+def run(
+    users: int = 50,
+    employees: int = 2000,
+    records_per_user: int = 20,
+    requests: int = 2000,
+    concurrency: int = 16,
+    mix: str = "default",
+    rng_seed: int = 42,
+) -> Dict[str, Dict[str, float]]:
+    """Seed, then drive ``requests`` requests from ``concurrency`` virtual users"""
+    from backend.main import app
+    from backend import auth, migrations
+
+    # httpx's ASGI transport doesn't run the app's lifespan
+    migrations.migrate()
+    usernames = seed(users, employees, records_per_user, rng_seed)
+    try:
+        return asyncio.run(_drive(app, usernames, requests, concurrency, MIXES[mix], rng_seed))
+    finally:
+        auth.password_service.shutdown()
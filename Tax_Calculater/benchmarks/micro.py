@@ -0,0 +1,57 @@
+"""
+Microbenchmarks for the hot functions behind the API
+"""
+import itertools
+from datetime import datetime, timedelta
+from typing import Dict
+
+from .harness import measure
+
+
+def run(iterations: int = 2000) -> Dict[str, Dict[str, float]]:
+    # Imported here so DATABASE_URL is already set (see benchmarks.harness)
+    # crud before auth, the same order as backend.main (the two import each other)
+    from backend import crud
+    from backend import auth, models, schemas
+
+    results = {}
+
+    results["calculate_tax (cache hit)"] = measure(lambda: crud.calculate_tax(850000.0, 2024), iterations)
+
+    salaries = itertools.count(100000.0, 0.5)
+    results["calculate_tax (cache miss)"] = measure(lambda: crud.calculate_tax(next(salaries), 2024), iterations)
+
+    batch = [300000.0 + i * 37.5 for i in range(10000)]
+    results["calculate_tax_many (10k rows)"] = measure(
+        lambda: crud.calculate_tax_many(batch), max(iterations // 20, 10)
+    )
+
+    results["create_access_token"] = measure(
+        lambda: auth.create_access_token({"sub": "bench-user"}, timedelta(minutes=30)), iterations
+    )
+    token = auth.create_access_token({"sub": "bench-user"}, timedelta(minutes=30))
+    # The decoder verify_token uses on a cache miss (JWT_BACKEND picks the library)
+    _, decode, _ = auth._jwt()
+    results["jwt decode"] = measure(
+        lambda: decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]), iterations
+    )
+    results["verify_token (cached)"] = measure(lambda: auth.verify_token(token), iterations)
+
+    now = datetime.utcnow()
+    records = [
+        models.TaxRecord(
+            id=i, user_id=1, gross_salary=500000.0 + i, tax_paid=12500.0, net_salary=487500.0 + i,
+            tax_year=2024, created_at=now, updated_at=None,
+        )
+        for i in range(100)
+    ]
+    results["TaxRecordPage serialize (100)"] = measure(
+        lambda: schemas.TaxRecordPage.model_validate({"items": records, "next_cursor": None}).model_dump_json(),
+        max(iterations // 10, 10),
+    )
+    breakdown = crud.calculate_tax(850000.0, 2024)
+    results["TaxBreakdown serialize"] = measure(
+        lambda: schemas.TaxBreakdown.model_validate({"gross_salary": 850000.0, "tax_year": 2024, **breakdown}).model_dump_json(),
+        iterations,
+    )
+    return results
@@ -0,0 +1,69 @@
+"""
+Cold-start benchmark
+
+Each iteration starts a fresh interpreter against a new, empty SQLite
+database and times: importing backend.main, the lifespan startup (which
+runs the migrations), the first response, and the whole process from
+launch to that first response. The last one is what autoscaling waits on.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from .harness import summarize
+
+# Launch-to-first-response budget (milliseconds) checked by --startup-budget
+DEFAULT_STARTUP_BUDGET_MS = 1500.0
+
+_CHILD = """
+import json, time
+from fastapi.testclient import TestClient
+start = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter()
+with TestClient(app) as client:
+    started = time.perf_counter()
+    client.get("/employees/records?limit=10").raise_for_status()
+    responded = time.perf_counter()
+print(json.dumps({
+    "import backend.main": imported - start,
+    "lifespan startup": started - imported,
+    "first response": responded - started,
+}))
+"""
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _launch() -> Dict[str, float]:
+    directory = tempfile.mkdtemp(prefix="taxcalc-startup-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'startup.db')}")
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _CHILD],
+        cwd=_ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    total = time.perf_counter() - start
+    phases = json.loads(output.strip().splitlines()[-1])
+    phases["process to first response"] = total
+    return phases
+
+
+def run(iterations: int = 5) -> Dict[str, Dict[str, float]]:
+    """Start the app ``iterations`` times, after one untimed launch to warm the OS file cache"""
+    _launch()
+    samples: Dict[str, list] = {}
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for phase, seconds in _launch().items():
+            samples.setdefault(phase, []).append(seconds)
+    elapsed = time.perf_counter() - start
+    return {phase: summarize(values, elapsed) for phase, values in samples.items()}
+
+
+def over_budget(results: Dict[str, Dict[str, float]], budget_ms: float) -> bool:
+    return results["process to first response"]["p50_ms"] > budget_ms
@@ -0,0 +1,46 @@
+"""
+Shared fixtures: the app against a throwaway SQLite database
+"""
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The backend reads DATABASE_URL on first use; point it somewhere disposable
+# before anything imports it
+_DB_DIR = tempfile.mkdtemp(prefix="taxcalc-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend.main import app  # noqa: E402
+
+_users = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    # Entering the client runs the lifespan, which creates the schema
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def register(client, username=None, password="secret-password"):
+    """Register and log in a new user; returns (username, auth headers)"""
+    username = username or f"user{next(_users)}"
+    response = client.post("/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": password,
+    })
+    assert response.status_code == 200, response.text
+    response = client.post("/auth/login", json={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return username, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return register(client)[1]
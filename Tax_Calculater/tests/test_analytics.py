@@ -0,0 +1,88 @@
+"""
+Incrementally maintained payroll aggregates against a full rebuild
+"""
+import itertools
+
+from sqlalchemy import func, select
+
+from backend import analytics, auth, crud, models, tax_engine
+from backend.database import SessionLocal
+
+from conftest import register
+
+_tax_numbers = itertools.count(1)
+
+
+def _register(client, salary, experience=5):
+    response = client.post("/employees/register", json={
+        "full_name": "Analytics Employee", "tax_number": f"STAT{next(_tax_numbers):06d}",
+        "years_of_experience": experience, "skills": "sales", "salary": salary,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["employee_id"]
+
+
+def _snapshot(db):
+    """Every aggregate row, with float totals rounded off"""
+    def rows(model, key):
+        return {
+            getattr(row, key): tuple(round(getattr(row, c), 2) if isinstance(getattr(row, c), float) else getattr(row, c)
+                                     for c in ("employee_count", "total_salary", "total_tax") if hasattr(row, c))
+            for row in db.scalars(select(model))
+            if row.employee_count
+        }
+    return (
+        rows(models.PayrollBracketStat, "bracket_index"),
+        rows(models.PayrollExperienceStat, "band"),
+        rows(models.PayrollRateBucket, "bucket"),
+    )
+
+
+def _assert_matches_rebuild():
+    with SessionLocal() as db:
+        incremental = _snapshot(db)
+        assert db.scalar(select(func.min(models.PayrollBracketStat.employee_count))) >= 0
+        analytics.refresh(db)
+        assert _snapshot(db) == incremental
+
+
+def test_registrations_and_bulk_keep_aggregates_exact(client):
+    for salary, experience in ((200000, 0), (400000, 4), (900000, 8), (2500000, 25)):
+        _register(client, salary, experience)
+    response = client.post("/employees/register/bulk", json=[
+        {"full_name": "Bulk Stat", "tax_number": f"STAT{next(_tax_numbers):06d}",
+         "years_of_experience": years, "skills": "ops", "salary": salary}
+        for salary, years in ((300000, 1), (650000, 12), (1800000, 30))
+    ])
+    assert response.json()["created_count"] == 3
+    _assert_matches_rebuild()
+
+    summary = client.get("/analytics/summary").json()
+    employees = client.get("/employees?limit=1000").json()["items"]
+    assert summary["employee_count"] == len(employees)
+
+
+def test_superseding_a_tax_after_the_schedule_changes(client, monkeypatch):
+    employee_id = _register(client, 1500000)
+    _assert_matches_rebuild()
+
+    # The "new" regime has a different slab table, so slab indexes no longer line up
+    monkeypatch.setattr(tax_engine, "DEFAULT_REGIME", "new")
+    with SessionLocal() as db:
+        crud.create_employee_tax(db, employee_id, 1500000)
+        assert db.get(models.PayrollStatsState, 1).schedule_key == analytics.schedule_key()
+    _assert_matches_rebuild()
+
+    monkeypatch.setattr(tax_engine, "DEFAULT_REGIME", "legacy")
+    _register(client, 700000)
+    _assert_matches_rebuild()
+
+
+def test_refresh_needs_an_admin(client, auth_headers, monkeypatch):
+    assert client.post("/analytics/refresh", headers=auth_headers).status_code == 403
+
+    username, headers = register(client)
+    monkeypatch.setattr(auth, "ADMIN_USERNAMES", frozenset([username]))
+    response = client.post("/analytics/refresh", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["employee_count"] >= 0
@@ -0,0 +1,110 @@
+"""
+The authenticated-user and verified-token caches, and deactivation
+"""
+import hashlib
+import time
+from datetime import timedelta
+
+from sqlalchemy import update
+
+from backend import async_crud, auth, models
+from backend.database import SessionLocal
+
+from conftest import register
+
+
+def _deactivate_orm(username):
+    with SessionLocal() as db:
+        db.query(models.User).filter(models.User.username == username).one().is_active = False
+        db.commit()
+
+
+def _deactivate_bulk(username):
+    with SessionLocal() as db:
+        db.execute(update(models.User).where(models.User.username == username).values(is_active=False))
+        db.commit()
+
+
+def test_deactivation_is_seen_at_once(client):
+    for deactivate in (_deactivate_orm, _deactivate_bulk):
+        username, headers = register(client)
+        assert client.get("/auth/me", headers=headers).status_code == 200
+        assert auth.user_cache.get(username) is not None
+
+        deactivate(username)
+        response = client.get("/auth/me", headers=headers)
+        assert response.status_code == 400, deactivate.__name__
+        assert response.json()["detail"] == "Inactive user"
+
+
+def test_lookup_racing_an_invalidation_is_not_cached(client, monkeypatch):
+    username, headers = register(client)
+    auth.user_cache.invalidate(username)
+    lookup = async_crud.get_user_by_username
+
+    async def racing_lookup(db, username):
+        user = await lookup(db, username=username)
+        # Another request deactivates the user while this one holds the old row
+        auth.invalidate_user(username)
+        return user
+
+    monkeypatch.setattr(async_crud, "get_user_by_username", racing_lookup)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert auth.user_cache.get(username) is None
+
+
+def test_bad_token_is_rejected(client):
+    assert client.get("/auth/me", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def _counting_decoder(monkeypatch):
+    """Count calls to the configured JWT decoder"""
+    encode, decode, errors = auth._jwt()
+    calls = []
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth, "_jwt", lambda: (encode, counting_decode, errors))
+    return calls
+
+
+def test_verified_token_is_cached(monkeypatch):
+    calls = _counting_decoder(monkeypatch)
+    token = auth.create_access_token({"sub": "token-cache-user"}, timedelta(minutes=5))
+    assert auth.verify_token(token) == "token-cache-user"
+    assert auth.verify_token(token) == "token-cache-user"
+    assert calls == [token]
+    assert auth.token_cache.get(hashlib.sha256(token.encode()).digest()) == "token-cache-user"
+
+
+def test_cached_token_expires_at_exp(monkeypatch):
+    calls = _counting_decoder(monkeypatch)
+    token = auth.create_access_token({"sub": "token-expiry-user"}, timedelta(seconds=2))
+    assert auth.verify_token(token) == "token-expiry-user"
+    _, decode, _ = auth._jwt()
+    exp = decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])["exp"]
+    calls.clear()
+
+    time.sleep(max(0.0, exp - time.time()) + 0.1)
+    assert auth.token_cache.get(hashlib.sha256(token.encode()).digest()) is None
+    # Past exp every check goes back to the decoder (which may allow the
+    # rest of the exp second), and nothing is cached again
+    auth.verify_token(token)
+    auth.verify_token(token)
+    assert calls == [token, token]
+
+
+def test_cached_token_still_sees_deactivation(client):
+    username, headers = register(client)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    token = headers["Authorization"].split(" ", 1)[1]
+    assert auth.token_cache.get(hashlib.sha256(token.encode()).digest()) == username
+
+    _deactivate_bulk(username)
+    response = client.get("/auth/me", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+    # The token itself is still valid; only the user lookup refused it
+    assert auth.token_cache.get(hashlib.sha256(token.encode()).digest()) == username
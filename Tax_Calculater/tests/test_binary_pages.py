@@ -0,0 +1,69 @@
+"""
+Arrow and Parquet listing pages round-trip to the same rows as the JSON pages
+"""
+import io
+from datetime import datetime
+
+import pytest
+
+from conftest import register
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+
+def _table(response):
+    assert response.status_code == 200, response.text
+    if response.headers["content-type"] == "application/x-parquet":
+        return pa.parquet.read_table(io.BytesIO(response.content))
+    assert response.headers["content-type"] == ARROW
+    return pa.ipc.open_stream(response.content).read_all()
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _rows(table):
+    return [{key: _json_value(value) for key, value in row.items()} for row in table.to_pylist()]
+
+
+@pytest.mark.parametrize("accept", [ARROW, PARQUET])
+def test_tax_record_pages(client, accept):
+    _, headers = register(client)
+    for salary in (400000, 800000, 1600000):
+        client.post("/tax/records", json={"gross_salary": salary, "tax_year": 2024}, headers=headers)
+
+    expected = client.get("/tax/records?limit=2", headers=headers).json()
+    response = client.get("/tax/records?limit=2", headers={**headers, "Accept": accept})
+    table = _table(response)
+    assert table.column_names == ["id", "gross_salary", "tax_paid", "net_salary", "tax_year", "created_at", "updated_at"]
+    assert _rows(table) == [{key: item[key] for key in table.column_names} for item in expected["items"]]
+    assert response.headers["X-Next-Cursor"] == expected["next_cursor"]
+
+    rest = _table(client.get(f"/tax/records?limit=2&cursor={expected['next_cursor']}", headers={**headers, "Accept": accept}))
+    assert [row["gross_salary"] for row in _rows(rest)] == [1600000]
+
+
+@pytest.mark.parametrize("accept", [ARROW, PARQUET])
+def test_employee_record_pages(client, accept):
+    name = f"Binary {accept.rsplit('/', 1)[-1]}"
+    for salary in (550000, 950000, 1750000):
+        client.post("/employees/register", json={
+            "full_name": name, "tax_number": f"BIN{len(accept)}{salary}",
+            "years_of_experience": 6, "skills": "rust", "salary": salary,
+        })
+
+    query = f"/employees/records?limit=2&name={name}&sort=salary&order=desc"
+    expected = client.get(query + "&format=columnar").json()
+    items = client.get(query).json()["items"]
+    response = client.get(query, headers={"Accept": accept})
+    table = _table(response)
+    assert table.column_names == list(expected["columns"])
+    assert {key: [row[key] for row in _rows(table)] for key in table.column_names} == expected["columns"]
+    assert table.column("salary").to_pylist() == [item["employee"]["salary"] for item in items] == [1750000, 950000]
+    assert response.headers["X-Next-Cursor"] == expected["next_cursor"]
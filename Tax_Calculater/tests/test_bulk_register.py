@@ -0,0 +1,58 @@
+"""
+Bulk employee registration
+"""
+import itertools
+
+_tax_numbers = itertools.count(1)
+
+
+def _employee(**overrides):
+    employee = {
+        "full_name": "Bulk Employee", "tax_number": f"BULK{next(_tax_numbers):06d}",
+        "years_of_experience": 4, "skills": "go", "salary": 900000,
+    }
+    employee.update(overrides)
+    return employee
+
+
+def test_bulk_creates_rows_and_reports_duplicates(client):
+    first, second = _employee(), _employee(salary=1500000)
+    response = client.post("/employees/register/bulk", json=[first, second, dict(first)])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["created_count"] == 2
+    assert [error["row"] for error in body["errors"]] == [2]
+    assert body["errors"][0]["tax_number"] == first["tax_number"]
+
+    again = client.post("/employees/register/bulk", json=[second]).json()
+    assert again["created_count"] == 0 and again["errors"][0]["row"] == 0
+
+    employee_id = body["created"][0]["employee_id"]
+    dashboard = client.get(f"/employees/{employee_id}/dashboard").json()
+    assert dashboard["tax"]["calculated_tax"] > 0
+
+
+def test_invalid_row_with_non_string_tax_number(client):
+    response = client.post("/employees/register/bulk", json=[
+        _employee(tax_number=123, salary="lots"),
+        _employee(tax_number=None, full_name=None),
+        "not an object",
+        _employee(),
+    ])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["created_count"] == 1
+    assert [(error["row"], error["tax_number"]) for error in body["errors"]] == [(0, "123"), (1, None), (2, None)]
+
+
+def test_csv_upload(client):
+    tax_number = f"BULK{next(_tax_numbers):06d}"
+    text = "full_name,tax_number,years_of_experience,skills,salary\r\n" \
+           f"Csv Row,{tax_number},2,sql,650000\r\n"
+    response = client.post("/employees/register/bulk", content=text, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200, response.text
+    assert response.json()["created"][0]["tax_number"] == tax_number
+
+
+def test_non_array_body_is_rejected(client):
+    assert client.post("/employees/register/bulk", json={"rows": []}).status_code == 400
@@ -0,0 +1,37 @@
+"""
+Connection pool wait accounting
+"""
+import sqlite3
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+from backend.database import PoolStats, _timed_pool_class
+
+
+def _pool(stats, pool_size=1, max_overflow=0):
+    pool_class = _timed_pool_class(QueuePool, stats)
+    return pool_class(lambda: sqlite3.connect(":memory:", check_same_thread=False),
+                      pool_size=pool_size, max_overflow=max_overflow, timeout=5)
+
+
+def test_uncontended_checkouts_are_not_waits():
+    stats = PoolStats()
+    pool = _pool(stats, pool_size=1, max_overflow=1)
+    first, second = pool.connect(), pool.connect()  # a new connection, then an overflow one
+    first.close()
+    second.close()
+    pool.connect().close()  # an idle one
+    assert stats.waits == 0
+
+
+def test_blocked_checkout_is_a_wait():
+    stats = PoolStats()
+    pool = _pool(stats)
+    held = pool.connect()
+    threading.Timer(0.05, held.close).start()
+    started = time.perf_counter()
+    pool.connect().close()
+    assert stats.waits == 1
+    assert 0.03 < stats.wait_seconds_max <= time.perf_counter() - started
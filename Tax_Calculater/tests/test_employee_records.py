@@ -0,0 +1,50 @@
+"""
+Sorted, filtered and columnar pages of /employees/records
+"""
+import itertools
+
+import pytest
+
+from test_pagination import _pages
+
+_tax_numbers = itertools.count(1)
+
+
+@pytest.mark.parametrize("sort,order", [("salary", "asc"), ("salary", "desc"), ("full_name", "asc"), ("created_at", "desc")])
+def test_employee_pages_follow_the_sort(client, sort, order):
+    for salary in (450000, 450000, 800000, 1100000, 2000000):
+        response = client.post("/employees/register", json={
+            "full_name": f"Employee {next(_tax_numbers)}", "tax_number": f"SORT{next(_tax_numbers):06d}",
+            "years_of_experience": 3, "skills": "python", "salary": salary,
+        })
+        assert response.status_code == 200, response.text
+
+    items = _pages(client, f"/employees/records?limit=3&sort={sort}&order={order}")
+    keys = [(item["employee"][sort], item["employee"]["employee_id"]) for item in items]
+    assert keys == sorted(keys, reverse=order == "desc")
+    assert len(keys) == len(set(keys))
+
+
+def test_cursor_cannot_switch_sort(client):
+    client.post("/employees/register", json={
+        "full_name": "Cursor Check", "tax_number": f"SORT{next(_tax_numbers):06d}",
+        "years_of_experience": 1, "skills": "sql", "salary": 500000,
+    })
+    cursor = client.get("/employees/records?limit=1&sort=salary").json()["next_cursor"]
+    assert cursor is not None
+    response = client.get(f"/employees/records?limit=1&sort=full_name&cursor={cursor}")
+    assert response.status_code == 400
+
+def test_filters_and_columnar_pages_match_the_json_pages(client):
+    for salary, experience in ((600000, 1), (900000, 8), (1300000, 12)):
+        client.post("/employees/register", json={
+            "full_name": "Columnar Check", "tax_number": f"SORT{next(_tax_numbers):06d}",
+            "years_of_experience": experience, "skills": "finance", "salary": salary,
+        })
+    query = "/employees/records?name=Columnar%20Check&min_experience=5&sort=salary&order=desc"
+    items = client.get(query).json()["items"]
+    assert [item["employee"]["salary"] for item in items] == [1300000, 900000]
+
+    columns = client.get(query + "&format=columnar").json()["columns"]
+    assert columns["employee_id"] == [item["employee"]["employee_id"] for item in items]
+    assert columns["calculated_tax"] == [item["tax"]["calculated_tax"] for item in items]
@@ -0,0 +1,32 @@
+"""
+Employee detail and listing agree on which tax row is the latest
+"""
+from datetime import datetime
+
+from backend import crud, models
+from backend.database import SessionLocal
+
+
+def test_latest_tax_breaks_created_at_ties_by_id(client):
+    response = client.post("/employees/register", json={
+        "full_name": "Tied Timestamps", "tax_number": "TIE000001",
+        "years_of_experience": 3, "skills": "audit", "salary": 800000,
+    })
+    assert response.status_code == 200, response.text
+    employee_id = response.json()["employee_id"]
+
+    with SessionLocal() as db:
+        crud.create_employee_tax(db, employee_id, 1600000)
+        taxes = db.query(models.EmployeeTax).filter(models.EmployeeTax.employee_id == employee_id).all()
+        assert len(taxes) == 2
+        # Rows written within one clock tick share created_at
+        tied = datetime(2024, 1, 1)
+        for tax in taxes:
+            tax.created_at = tied
+        db.commit()
+        newest = max(tax.id for tax in taxes)
+
+    dashboard = client.get(f"/employees/{employee_id}/dashboard").json()
+    listing = client.get("/employees/records", params={"name": "Tied Timestamps"}).json()["items"]
+    assert dashboard["tax"]["id"] == newest
+    assert [item["tax"]["id"] for item in listing] == [newest]
@@ -0,0 +1,87 @@
+"""
+Streaming NDJSON and CSV exports across more than one cursor partition
+"""
+import csv
+import io
+import json
+
+import pytest
+
+from backend import export, models
+from backend.database import SessionLocal
+
+from conftest import register
+
+# Enough rows that the server-side cursor hands back at least two partitions
+ROWS = export.EXPORT_CHUNK_SIZE + 7
+
+TAX_RECORD_COLUMNS = ["id", "gross_salary", "tax_paid", "net_salary", "tax_year", "created_at", "updated_at"]
+EMPLOYEE_COLUMNS = [
+    "employee_id", "full_name", "tax_number", "years_of_experience", "skills", "salary", "created_at",
+    "calculated_tax", "tax_rate", "tax_created_at",
+]
+
+
+@pytest.fixture(scope="module")
+def exporter(client):
+    """A user owning ROWS tax records"""
+    _, headers = register(client)
+    user_id = client.get("/auth/me", headers=headers).json()["id"]
+    with SessionLocal() as db:
+        db.add_all(
+            models.TaxRecord(user_id=user_id, gross_salary=600000 + i, tax_paid=1000, net_salary=599000 + i, tax_year=2024)
+            for i in range(ROWS)
+        )
+        db.commit()
+    return headers
+
+
+@pytest.fixture(scope="module")
+def employee_count(client):
+    """Make sure there are more employees than one partition holds"""
+    client.post("/employees/register/bulk", json=[
+        {"full_name": "Export Employee", "tax_number": f"EXPORT{i:06d}", "years_of_experience": 2,
+         "skills": "excel", "salary": 700000 + i}
+        for i in range(ROWS)
+    ])
+    with SessionLocal() as db:
+        return db.query(models.Employee).count()
+
+
+def _csv(response):
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    return list(csv.reader(io.StringIO(response.text)))
+
+
+def _ndjson(response):
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_tax_record_csv_export(client, exporter):
+    rows = _csv(client.get("/tax/records/export?format=csv", headers=exporter))
+    assert rows[0] == TAX_RECORD_COLUMNS
+    assert len(rows) - 1 == ROWS
+    assert len({row[0] for row in rows[1:]}) == ROWS
+
+
+def test_tax_record_ndjson_export(client, exporter):
+    rows = _ndjson(client.get("/tax/records/export", headers=exporter))
+    assert len(rows) == ROWS
+    assert list(rows[0]) == TAX_RECORD_COLUMNS
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+
+def test_employee_csv_export(client, employee_count):
+    assert employee_count > export.EXPORT_CHUNK_SIZE
+    rows = _csv(client.get("/employees/export?format=csv"))
+    assert rows[0] == EMPLOYEE_COLUMNS
+    assert len(rows) - 1 == employee_count
+
+
+def test_employee_ndjson_export(client, employee_count):
+    rows = _ndjson(client.get("/employees/export?format=ndjson"))
+    assert len(rows) == employee_count
+    assert len({row["employee_id"] for row in rows}) == employee_count
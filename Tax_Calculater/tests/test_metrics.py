@@ -0,0 +1,40 @@
+"""
+Request metrics are labelled with route templates, not raw paths
+"""
+from backend import metrics
+
+
+def _sample(text, line_prefix):
+    """Value of the one exposition line starting with line_prefix, or 0"""
+    values = [float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(line_prefix + " ")]
+    assert len(values) <= 1
+    return values[0] if values else 0
+
+
+def test_requests_are_counted_per_route_template(client, auth_headers):
+    record_id = client.post("/tax/records", json={"gross_salary": 750000, "tax_year": 2024}, headers=auth_headers).json()["id"]
+    counter = 'http_requests_total{method="GET",route="/tax/records/{record_id}",status="200"}'
+    duration = 'http_request_duration_seconds_count{method="GET",route="/tax/records/{record_id}"}'
+    before = client.get("/metrics").text
+
+    for _ in range(3):
+        assert client.get(f"/tax/records/{record_id}", headers=auth_headers).status_code == 200
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    after = response.text
+
+    assert _sample(after, counter) - _sample(before, counter) == 3
+    assert _sample(after, duration) - _sample(before, duration) == 3
+    assert f'route="/tax/records/{record_id}"' not in after
+
+
+def test_unmatched_paths_share_one_label(client):
+    before = client.get("/metrics").text
+    for path in ("/no/such/path", "/another/missing/path"):
+        assert client.get(path).status_code == 404
+    after = client.get("/metrics").text
+
+    counter = 'http_requests_total{method="GET",route="unmatched",status="404"}'
+    assert _sample(after, counter) - _sample(before, counter) == 2
+    assert "/no/such/path" not in after
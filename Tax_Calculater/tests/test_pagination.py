@@ -0,0 +1,48 @@
+"""
+Keyset cursors on /tax/records and /employees
+"""
+import itertools
+
+_tax_numbers = itertools.count(1)
+
+
+def _pages(client, url, headers=None):
+    items, cursor = [], None
+    while True:
+        page = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+        assert page.status_code == 200, page.text
+        body = page.json()
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_tax_record_pages_cover_every_record_once(client, auth_headers):
+    for salary in (300000, 600000, 900000, 1200000, 1500000):
+        response = client.post("/tax/records", json={"gross_salary": salary, "tax_year": 2024}, headers=auth_headers)
+        assert response.status_code == 200, response.text
+
+    items = _pages(client, "/tax/records?limit=2", auth_headers)
+    assert [item["gross_salary"] for item in items] == [300000, 600000, 900000, 1200000, 1500000]
+    assert len({item["id"] for item in items}) == 5
+
+
+def test_employee_pages_cover_every_employee_once(client):
+    registered = []
+    for salary in (350000, 700000, 1050000):
+        response = client.post("/employees/register", json={
+            "full_name": "Listing Employee", "tax_number": f"PAGE{next(_tax_numbers):06d}",
+            "years_of_experience": 2, "skills": "ops", "salary": salary,
+        })
+        assert response.status_code == 200, response.text
+        registered.append(response.json()["employee_id"])
+
+    ids = [item["employee_id"] for item in _pages(client, "/employees?limit=2")]
+    assert ids == sorted(set(ids))
+    assert set(registered) <= set(ids)
+
+
+def test_malformed_cursor_is_a_400(client, auth_headers):
+    assert client.get("/tax/records?cursor=not-a-cursor", headers=auth_headers).status_code == 400
+    assert client.get("/employees?cursor=bm9wZQ").status_code == 400
@@ -0,0 +1,55 @@
+"""
+Full-scan detection in the query plan audit
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+
+from backend import query_audit
+
+
+@pytest.fixture
+def sqlite_conn():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (id INTEGER PRIMARY KEY, a INTEGER, b TEXT)")
+        conn.exec_driver_sql("CREATE INDEX ix_t_a ON t (a)")
+        yield conn
+
+
+@pytest.mark.parametrize("statement,full_scan", [
+    ("SELECT b FROM t", True),
+    ("SELECT b FROM t LIMIT 10", True),
+    ("SELECT a FROM t ORDER BY a", True),
+    ("SELECT a FROM t ORDER BY a LIMIT 10", False),
+    ("SELECT b FROM t ORDER BY b LIMIT 10", True),
+    ("SELECT a FROM t WHERE a = 3", False),
+    ("SELECT b FROM t WHERE id IN (SELECT id FROM t ORDER BY a LIMIT 5)", False),
+])
+def test_sqlite_scans(sqlite_conn, statement, full_scan):
+    lines, scanned = query_audit._explain(sqlite_conn, statement, ())
+    assert (scanned == ["t"]) == full_scan, lines
+
+
+def _pg_conn(plan):
+    result = SimpleNamespace(scalar=lambda: json.dumps([{"Plan": plan}]))
+    return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), exec_driver_sql=lambda *args: result)
+
+
+def _index_scan(**extra):
+    return {"Node Type": "Index Only Scan", "Relation Name": "employees", **extra}
+
+
+@pytest.mark.parametrize("plan,full_scan", [
+    ({"Node Type": "Seq Scan", "Relation Name": "employees"}, True),
+    (_index_scan(), True),
+    (_index_scan(**{"Index Cond": "(salary > 1)"}), False),
+    ({"Node Type": "Limit", "Plans": [_index_scan()]}, False),
+    ({"Node Type": "Limit", "Plans": [{"Node Type": "Sort", "Plans": [_index_scan()]}]}, True),
+    ({"Node Type": "Aggregate", "Plans": [{"Node Type": "Index Scan", "Relation Name": "employees"}]}, True),
+])
+def test_postgresql_scans(plan, full_scan):
+    lines, scanned = query_audit._explain(_pg_conn(plan), "SELECT 1", {})
+    assert (scanned == ["employees"]) == full_scan, lines
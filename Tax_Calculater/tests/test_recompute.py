@@ -0,0 +1,148 @@
+"""
+Recompute jobs: access, queueing, one job at a time, takeover of dead jobs
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import auth, models, recompute
+from backend.database import SessionLocal
+
+from conftest import register
+
+
+@pytest.fixture
+def admin_headers(client, monkeypatch):
+    username, headers = register(client)
+    monkeypatch.setattr(auth, "ADMIN_USERNAMES", frozenset([username]))
+    return headers
+
+
+@pytest.fixture
+def job():
+    """A job that looks like it is running, left failed afterwards so it never blocks other tests"""
+    with SessionLocal() as db:
+        job = recompute.create_job(db, 1)
+        job.status = "running"
+        db.commit()
+        job_id = job.id
+    yield job_id
+    with SessionLocal() as db:
+        db.get(models.RecomputeJob, job_id).status = "failed"
+        db.commit()
+
+
+@pytest.fixture(autouse=True)
+def no_queued_jobs():
+    """Jobs a test queued but never ran would block every later start"""
+    yield
+    with SessionLocal() as db:
+        for queued in db.query(models.RecomputeJob).filter(models.RecomputeJob.status == "pending"):
+            queued.status = "failed"
+        db.commit()
+
+
+def _set_heartbeat(job_id, age_seconds):
+    with SessionLocal() as db:
+        db.get(models.RecomputeJob, job_id).updated_at = datetime.utcnow() - timedelta(seconds=age_seconds)
+        db.commit()
+
+
+def test_operator_endpoints_need_an_admin(client, auth_headers):
+    assert client.post("/tax/recompute", headers=auth_headers).status_code == 403
+    assert client.post("/tax/recompute/1/resume", headers=auth_headers).status_code == 403
+    assert client.post("/tax/recompute").status_code in (401, 403)
+
+
+def test_recompute_runs_to_completion(client, admin_headers):
+    client.post("/tax/records", json={"gross_salary": 1200000, "tax_year": 2024}, headers=admin_headers)
+    response = client.post("/tax/recompute", headers=admin_headers)
+    assert response.status_code == 202, response.text
+    # The API only queues the job
+    assert response.json()["status"] == "pending"
+    recompute.work(once=True)
+    progress = client.get(f"/tax/recompute/{response.json()['id']}", headers=admin_headers).json()
+    assert progress["status"] == "completed"
+    assert progress["rows_done"] == progress["rows_total"] > 0
+
+
+def test_start_is_refused_while_a_job_is_live(client, admin_headers, job):
+    response = client.post("/tax/recompute", headers=admin_headers)
+    assert response.status_code == 409
+    assert str(job) in response.json()["detail"]
+    assert client.post(f"/tax/recompute/{job}/resume", headers=admin_headers).status_code == 409
+
+
+def test_queued_job_blocks_another_start(client, admin_headers):
+    queued = client.post("/tax/recompute", headers=admin_headers).json()["id"]
+    response = client.post("/tax/recompute", headers=admin_headers)
+    assert response.status_code == 409
+    assert str(queued) in response.json()["detail"]
+
+
+def test_dead_job_is_queued_again_on_resume(client, admin_headers, job):
+    _set_heartbeat(job, recompute.RECOMPUTE_STALE_SECONDS + 60)
+    response = client.post(f"/tax/recompute/{job}/resume", params={"workers": 2}, headers=admin_headers)
+    assert response.status_code == 202, response.text
+    assert response.json()["status"] == "pending"
+    assert response.json()["workers"] == 2
+    recompute.work(once=True)
+    assert client.get(f"/tax/recompute/{job}", headers=admin_headers).json()["status"] == "completed"
+
+
+def test_worker_takes_over_a_dead_job(client, admin_headers, job):
+    _set_heartbeat(job, recompute.RECOMPUTE_STALE_SECONDS + 60)
+    recompute.work(once=True)
+    assert client.get(f"/tax/recompute/{job}", headers=admin_headers).json()["status"] == "completed"
+
+
+def test_worker_leaves_a_live_job_alone(job):
+    recompute.work(once=True)
+    with SessionLocal() as db:
+        assert db.get(models.RecomputeJob, job).status == "running"
+
+
+def test_stale_job_does_not_block_a_new_one(client, admin_headers, job):
+    _set_heartbeat(job, recompute.RECOMPUTE_STALE_SECONDS + 60)
+    response = client.post("/tax/recompute", headers=admin_headers)
+    assert response.status_code == 202, response.text
+
+
+def test_cli_resume_uses_the_jobs_worker_count(job, monkeypatch):
+    _set_heartbeat(job, recompute.RECOMPUTE_STALE_SECONDS + 60)
+    calls = []
+
+    def run_job(job_id, workers, chunk_size):
+        calls.append(workers)
+        with SessionLocal() as db:
+            return db.get(models.RecomputeJob, job_id)
+
+    monkeypatch.setattr(recompute, "run_job", run_job)
+    recompute.main(["--resume", str(job)])
+    # None lets run_job fall back to the job's stored worker count
+    assert calls == [None]
+
+
+def test_rows_without_rules_are_skipped_and_counted(client, auth_headers, monkeypatch):
+    from backend import tax_engine
+
+    for year in (2019, 2024):
+        client.post("/tax/records", json={"gross_salary": 900000, "tax_year": year}, headers=auth_headers)
+    # The "new" regime starts in 2020, so 2019 records have no rules under it
+    monkeypatch.setattr(tax_engine, "DEFAULT_REGIME", "new")
+    with SessionLocal() as db:
+        job = recompute.create_job(db, 1)
+        shard_id = next(shard.id for shard in job.shards if shard.table_name == "tax_records")
+        job_id = job.id
+    try:
+        recompute.run_shard(shard_id)
+        with SessionLocal() as db:
+            shard = db.get(models.RecomputeShard, shard_id)
+            assert shard.status == "completed"
+            assert shard.rows_done == shard.rows_total
+            assert shard.rows_skipped >= 1
+            assert recompute.job_progress(db, job_id)["rows_skipped"] == shard.rows_skipped
+    finally:
+        with SessionLocal() as db:
+            db.get(models.RecomputeJob, job_id).status = "failed"
+            db.commit()
@@ -0,0 +1,69 @@
+"""
+/tax/calculate validation and conditional requests
+"""
+import pytest
+
+URL = "/tax/calculate?gross_salary=750000&tax_year=2024"
+
+
+def test_etag_round_trip(client):
+    response = client.get(URL)
+    assert response.status_code == 200
+    assert response.json()["tax_paid"] == 62499.75
+    assert response.headers["cache-control"] == "no-cache"
+    etag = response.headers["etag"]
+
+    assert client.get(URL, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(URL.replace("750000", "750001"), headers={"If-None-Match": etag}).status_code == 200
+
+
+@pytest.mark.parametrize("header", [
+    "{etag}",
+    "W/{etag}",
+    '"0000000000000000", {etag}',
+    '"0000000000000000",W/{etag} ',
+    "*",
+])
+def test_if_none_match_forms(client, header):
+    etag = client.get(URL).headers["etag"]
+    response = client.get(URL, headers={"If-None-Match": header.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+@pytest.mark.parametrize("header", ['"0000000000000000"', "", 'W/"other", "another"'])
+def test_if_none_match_miss(client, header):
+    assert client.get(URL, headers={"If-None-Match": header}).status_code == 200
+
+
+def test_invalid_input(client):
+    assert client.get("/tax/calculate?gross_salary=0").status_code == 400
+    assert client.get("/tax/calculate?gross_salary=100000&regime=nope").status_code == 400
+    assert client.post("/tax/calculate", json={"gross_salary": 100000, "tax_year": 1999, "regime": "new"}).status_code == 400
+
+
+def test_batch_matches_single_calculations(client):
+    response = client.post("/tax/calculate/batch", json={
+        "gross_salaries": [300000, 750000, 1500000], "tax_years": [2024, 2024, 2023],
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    for salary, year, tax in zip(body["gross_salary"], body["tax_year"], body["tax_paid"]):
+        assert client.get(f"/tax/calculate?gross_salary={salary}&tax_year={year}").json()["tax_paid"] == tax
+
+
+def test_batch_limits(client, monkeypatch):
+    from backend import main
+
+    monkeypatch.setattr(main, "TAX_BATCH_MAX_ROWS", 10)
+    monkeypatch.setattr(main, "TAX_BATCH_INLINE_ROWS", 3)
+    too_many = client.post("/tax/calculate/batch", json={"gross_salaries": [500000] * 11, "tax_years": [2024] * 11})
+    assert too_many.status_code == 413
+
+    # Over the inline threshold: calculated on the threadpool, same answers and errors
+    offloaded = client.post("/tax/calculate/batch", json={"gross_salaries": [500000] * 10, "tax_years": [2024] * 10})
+    assert offloaded.status_code == 200
+    assert offloaded.json()["tax_paid"] == [12499.95] * 10
+    invalid = client.post("/tax/calculate/batch", json={"gross_salaries": [500000] * 9 + [0], "tax_years": [2024] * 10})
+    assert invalid.status_code == 400
+    assert invalid.json()["detail"]["indices"] == [9]
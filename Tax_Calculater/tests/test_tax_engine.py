@@ -0,0 +1,83 @@
+"""
+The compiled engine against the original per-bracket loop
+"""
+import numpy as np
+import pytest
+
+from backend import crud, tax_engine
+
+# The slab table and loop calculate_tax used before the rules were compiled
+ORIGINAL_BRACKETS = [
+    {"min": 0, "max": 250000, "rate": 0.0},
+    {"min": 250001, "max": 500000, "rate": 0.05},
+    {"min": 500001, "max": 1000000, "rate": 0.20},
+    {"min": 1000001, "max": float('inf'), "rate": 0.30}
+]
+
+
+def original_tax(gross_salary):
+    total_tax = 0.0
+    for bracket in ORIGINAL_BRACKETS:
+        lower, upper, rate = bracket["min"], bracket["max"], bracket["rate"]
+        if gross_salary > lower:
+            total_tax += (min(gross_salary, upper) - lower) * rate
+    return total_tax
+
+
+def original_calculate_tax(gross_salary):
+    total_tax = original_tax(gross_salary)
+    net_salary = gross_salary - total_tax
+    tax_rate = (total_tax / gross_salary * 100) if gross_salary > 0 else 0
+    return {"tax_paid": round(total_tax, 2), "net_salary": round(net_salary, 2), "tax_rate": round(tax_rate, 2)}
+
+
+def _edges():
+    salaries = [0, 0.01, 1, 100000, 1e7, 123456789.99]
+    for bracket in ORIGINAL_BRACKETS:
+        for bound in (bracket["min"], bracket["max"]):
+            if bound != float("inf"):
+                salaries += [bound - 1, bound - 0.5, bound - 0.01, bound, bound + 0.01, bound + 0.5, bound + 1]
+    return sorted(set(s for s in salaries if s >= 0))
+
+
+EDGES = _edges()
+
+
+@pytest.mark.parametrize("salary", EDGES)
+def test_legacy_schedule_matches_original(salary):
+    schedule = tax_engine.get_schedule("legacy")
+    assert schedule.calculate(salary) == original_calculate_tax(salary)
+
+
+def test_calculate_many_matches_original():
+    salaries = np.array(EDGES + list(np.random.default_rng(0).uniform(0, 5e6, 2000)))
+    slabs = tax_engine.get_schedule("legacy").slabs
+    # Unrounded, so a sum landing on a half cent cannot round either way
+    tax = slabs.calculate_many(salaries, rounded=False)["tax_paid"]
+    expected = [original_tax(float(salary)) for salary in salaries]
+    np.testing.assert_allclose(tax, expected, rtol=1e-12, atol=1e-6)
+    assert [slabs.tax_for(float(salary)) for salary in salaries] == pytest.approx(expected, rel=1e-12, abs=1e-6)
+
+
+def test_calculate_many_across_years_matches_scalar():
+    salaries = [300000, 750000, 1500000, 5500000, 12000000]
+    years = [2020, 2023, 2024, 2025, 2025]
+    result = tax_engine.calculate_many(salaries, years, "new")
+    for i, (salary, year) in enumerate(zip(salaries, years)):
+        expected = tax_engine.get_schedule("new", year).calculate(salary)
+        assert result["tax_paid"][i] == pytest.approx(expected["tax_paid"], abs=0.01)
+        assert result["tax_rate"][i] == pytest.approx(expected["tax_rate"], abs=0.01)
+
+
+def test_crud_calculate_tax_defaults_to_original_slabs():
+    result = crud.calculate_tax(750000)
+    assert result["tax_paid"] == original_calculate_tax(750000)["tax_paid"]
+    assert result["regime"] == "legacy"
+    assert result["tax_brackets"] == ORIGINAL_BRACKETS
+
+
+def test_unknown_rules_raise():
+    with pytest.raises(tax_engine.UnknownTaxRuleError):
+        tax_engine.get_schedule("nope", 2024)
+    with pytest.raises(tax_engine.UnknownTaxRuleError):
+        tax_engine.get_schedule("new", 1999)
@@ -0,0 +1,59 @@
+"""
+Tax records: ownership and the per-year summary
+"""
+from conftest import register
+
+
+def test_summary_totals_per_year(client):
+    _, headers = register(client)
+    for salary, year in ((600000, 2023), (900000, 2024), (1200000, 2024)):
+        response = client.post("/tax/records", json={"gross_salary": salary, "tax_year": year}, headers=headers)
+        assert response.status_code == 200, response.text
+    records = client.get("/tax/records", headers=headers).json()["items"]
+
+    summary = client.get("/tax/records/summary", headers=headers).json()
+    assert summary["record_count"] == 3
+    assert summary["total_gross_salary"] == 2700000
+    assert summary["total_tax_paid"] == round(sum(r["tax_paid"] for r in records), 2)
+    assert [(y["tax_year"], y["record_count"]) for y in summary["by_year"]] == [(2023, 1), (2024, 2)]
+
+
+def test_empty_summary(client, auth_headers):
+    summary = client.get("/tax/records/summary", headers=auth_headers).json()
+    assert summary["record_count"] == 0 and summary["by_year"] == []
+    assert summary["average_tax_rate"] == 0.0
+
+
+def test_records_are_private(client):
+    _, owner = register(client)
+    _, other = register(client)
+    record = client.post("/tax/records", json={"gross_salary": 800000, "tax_year": 2024}, headers=owner).json()
+    assert client.get(f"/tax/records/{record['id']}", headers=owner).status_code == 200
+    assert client.get(f"/tax/records/{record['id']}", headers=other).status_code == 404
+    assert client.get("/tax/records/summary", headers=other).json()["record_count"] == 0
+
+
+def test_records_before_2020_use_the_legacy_slabs(client, auth_headers):
+    response = client.post("/tax/records", json={"gross_salary": 750000, "tax_year": 2019}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    record = response.json()
+    assert record["tax_paid"] == 62499.75
+
+    response = client.put(f"/tax/records/{record['id']}", json={"tax_year": 2015, "gross_salary": 300000},
+                          headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["tax_year"] == 2015
+    assert response.json()["tax_paid"] == 2499.95
+
+
+def test_year_without_rules_is_a_400(client, auth_headers, monkeypatch):
+    from backend import tax_engine
+
+    record = client.post("/tax/records", json={"gross_salary": 500000, "tax_year": 2024}, headers=auth_headers).json()
+    monkeypatch.setattr(tax_engine, "DEFAULT_REGIME", "new")
+    response = client.post("/tax/records", json={"gross_salary": 500000, "tax_year": 2019}, headers=auth_headers)
+    assert response.status_code == 400
+    response = client.put(f"/tax/records/{record['id']}", json={"tax_year": 2019}, headers=auth_headers)
+    assert response.status_code == 400
+    monkeypatch.setattr(tax_engine, "DEFAULT_REGIME", "legacy")
+    assert client.get(f"/tax/records/{record['id']}", headers=auth_headers).json()["tax_year"] == 2024